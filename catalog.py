@@ -0,0 +1,320 @@
+import os
+import time
+import socket
+import sqlite3
+from typing import Iterable, List, Optional
+import config
+
+DB_PATH = config.CATALOG_DB
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS filings (
+    accession        TEXT PRIMARY KEY,
+    cik              TEXT NOT NULL,
+    ticker           TEXT,
+    form             TEXT NOT NULL,
+    filing_date      TEXT NOT NULL,
+    filing_key       TEXT NOT NULL,
+    base_url         TEXT NOT NULL,
+    primary_document TEXT,
+    primary_status   TEXT,
+    discovered_via   TEXT,
+    created_at       REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_filings_cik_form_date ON filings (cik, form, filing_date);
+CREATE INDEX IF NOT EXISTS idx_filings_primary ON filings (primary_status);
+
+CREATE TABLE IF NOT EXISTS documents (
+    accession     TEXT NOT NULL REFERENCES filings (accession),
+    name          TEXT NOT NULL,
+    kind          TEXT NOT NULL,
+    url           TEXT NOT NULL,
+    fetch_status  TEXT NOT NULL DEFAULT 'pending',
+    content_hash  TEXT,
+    size          INTEGER,
+    fetched_at    REAL,
+    clean_status  TEXT,
+    clean_path    TEXT,
+    facts_path    TEXT,
+    error         TEXT,
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    retry_at      REAL,
+    claimed_by    TEXT,
+    lease_until   REAL,
+    PRIMARY KEY (accession, name)
+);
+CREATE INDEX IF NOT EXISTS idx_documents_fetch ON documents (fetch_status, kind);
+CREATE INDEX IF NOT EXISTS idx_documents_clean ON documents (clean_status);
+
+CREATE TABLE IF NOT EXISTS runs (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    source      TEXT NOT NULL,
+    kind        TEXT NOT NULL,
+    stamp       TEXT,
+    output_path TEXT NOT NULL,
+    created_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_source ON runs (source, kind, created_at);
+"""
+
+# Which documents each stage works on: (new work, failed work that may be retried)
+STAGE_FILTERS = {
+    "fetch": ("d.fetch_status = 'pending'", "d.fetch_status = 'failed'"),
+    "clean": (
+        "d.kind = 'primary' AND d.fetch_status = 'fetched' AND d.clean_status = 'pending'",
+        "d.kind = 'primary' AND d.fetch_status = 'fetched' AND d.clean_status = 'failed'",
+    ),
+}
+
+# Columns added after the first release of the schema
+MIGRATIONS = {
+    "attempts": "ALTER TABLE documents ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0",
+    "retry_at": "ALTER TABLE documents ADD COLUMN retry_at REAL",
+}
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def filing_key(filing_date: str, form: str, accession: str) -> str:
+    # Same YYYY-MM-DD_FORM_ACCESSION key the raw store uses
+    return f"{filing_date}_{form}_{accession}".replace("/", "_").replace("\\", "_")
+
+
+class Catalog:
+    """
+    Metadata catalog (SQLite, WAL mode) shared by every pipeline stage: filings,
+    their documents with fetch/clean status and content hashes, and the output
+    files of GDELT/FRED runs. Stages find work with indexed queries and claim it
+    with a lease, so several workers can run the same stage concurrently.
+    """
+
+    def __init__(self, db_path: str = DB_PATH):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(documents)")}
+        for column, sql in MIGRATIONS.items():
+            if column not in columns:
+                self.conn.execute(sql)
+
+    def close(self):
+        self.conn.close()
+
+    def _write(self, sql: str, params=()):
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            cur = self.conn.execute(sql, params)
+            self.conn.execute("COMMIT")
+            return cur
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    # --- Filings ---
+
+    def upsert_filing(self, item: dict, ticker: str, cik: str, discovered_via: str) -> bool:
+        """
+        Registers a filing (submissions-JSON item shape) plus its index and full-text documents.
+        Returns True if the filing was new.
+        """
+        accession = item["accession_number"]
+        key = filing_key(item["filing_date"], item["form"], accession)
+
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            cur = self.conn.execute(
+                "INSERT OR IGNORE INTO filings VALUES (?, ?, ?, ?, ?, ?, ?, ?, NULL, ?, ?)",
+                (
+                    accession, cik, ticker, item["form"], item["filing_date"], key,
+                    item["filing_base_url"], item.get("primary_document"), discovered_via, time.time()
+                )
+            )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO documents (accession, name, kind, url) VALUES (?, ?, ?, ?)",
+                [
+                    (accession, f"{accession}-index.html", "index", item["index_html_url"]),
+                    (accession, f"{accession}.txt", "full_text", item["full_text_url"]),
+                ]
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+        return cur.rowcount > 0
+
+    def filings_needing_primary(self, accession: str = None) -> List[sqlite3.Row]:
+        """Filings whose index page is fetched but whose primary document is not resolved yet."""
+        sql = """
+            SELECT f.*, d.name AS index_name FROM filings f
+            JOIN documents d ON d.accession = f.accession AND d.kind = 'index'
+            WHERE d.fetch_status = 'fetched' AND f.primary_status IS NULL
+        """
+        params = []
+        if accession:
+            sql += " AND f.accession = ?"
+            params.append(accession)
+        return self.conn.execute(sql + " ORDER BY f.filing_date DESC", params).fetchall()
+
+    def accessions(self, ciks: Iterable[str]) -> set:
+        """Accession numbers already registered for these CIKs."""
+        ciks = list(ciks)
+        rows = self.conn.execute(
+            f"SELECT accession FROM filings WHERE cik IN ({','.join('?' * len(ciks))})", ciks
+        ).fetchall()
+        return {r[0] for r in rows}
+
+    def filing(self, accession: str) -> Optional[sqlite3.Row]:
+        return self.conn.execute("SELECT * FROM filings WHERE accession = ?", (accession,)).fetchone()
+
+    def set_primary(self, accession: str, name: Optional[str], url: Optional[str] = None):
+        """Records the resolved primary document (or that none exists) and queues it for fetching."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute(
+                "UPDATE filings SET primary_document = COALESCE(?, primary_document), primary_status = ? WHERE accession = ?",
+                (name, "found" if name else "missing", accession)
+            )
+            if name:
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO documents (accession, name, kind, url, clean_status) VALUES (?, ?, 'primary', ?, 'pending')",
+                    (accession, name, url)
+                )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    # --- Documents ---
+
+    def _stage_query(self, stage: str, kinds: Iterable[str] = None):
+        # failed documents come back after a backoff, until they have used every attempt
+        new, failed = STAGE_FILTERS[stage]
+        sql = f"""
+            SELECT d.accession, d.name FROM documents d
+            JOIN filings f ON f.accession = d.accession
+            WHERE (({new}) OR (({failed}) AND d.attempts < ? AND COALESCE(d.retry_at, 0) <= ?))
+        """
+        params = [config.CATALOG_MAX_ATTEMPTS, time.time()]
+        if kinds:
+            kinds = list(kinds)
+            sql += f" AND d.kind IN ({','.join('?' * len(kinds))})"
+            params += kinds
+        return sql, params
+
+    def documents_needing(self, stage: str, kinds: Iterable[str] = None) -> List[sqlite3.Row]:
+        """Documents needing `stage` ("fetch" or "clean"), without claiming them."""
+        sql, params = self._stage_query(stage, kinds)
+        keys = self.conn.execute(sql + " ORDER BY f.filing_date DESC", params).fetchall()
+        return [self.document(r["accession"], r["name"]) for r in keys]
+
+    def claim_documents(self, stage: str, worker: str, kinds: Iterable[str] = None,
+                        limit: int = 100, lease_seconds: float = 600) -> List[sqlite3.Row]:
+        """
+        Atomically leases up to `limit` documents needing `stage` ("fetch" or "clean"),
+        newest filings first. Expired leases (crashed workers) are claimable again.
+        """
+        now = time.time()
+        sql, params = self._stage_query(stage, kinds)
+        sql += " AND (d.lease_until IS NULL OR d.lease_until < ?) ORDER BY f.filing_date DESC LIMIT ?"
+        params += [now, limit]
+
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            keys = [(r["accession"], r["name"]) for r in self.conn.execute(sql, params)]
+            self.conn.executemany(
+                "UPDATE documents SET claimed_by = ?, lease_until = ? WHERE accession = ? AND name = ?",
+                [(worker, now + lease_seconds, a, n) for a, n in keys]
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+        return [self.document(a, n) for a, n in keys]
+
+    def document(self, accession: str, name: str) -> sqlite3.Row:
+        return self.conn.execute(
+            """
+            SELECT d.*, f.cik, f.ticker, f.form, f.filing_date, f.filing_key, f.base_url
+            FROM documents d JOIN filings f ON f.accession = d.accession
+            WHERE d.accession = ? AND d.name = ?
+            """,
+            (accession, name)
+        ).fetchone()
+
+    def _record_attempt(self, ok: bool):
+        """SQL fragment: success resets the attempt count, failure schedules a retry with backoff."""
+        if ok:
+            return "attempts = 0, retry_at = NULL", []
+        return "attempts = attempts + 1, retry_at = ? * (1 << attempts) + ?", [config.CATALOG_RETRY_BACKOFF, time.time()]
+
+    def record_fetch(self, accession: str, name: str, ok: bool, content_hash: str = None,
+                     size: int = None, error: str = None):
+        attempt, params = self._record_attempt(ok)
+        self._write(
+            f"""
+            UPDATE documents SET fetch_status = ?, content_hash = ?, size = ?, fetched_at = ?,
+                   error = ?, claimed_by = NULL, lease_until = NULL, {attempt}
+            WHERE accession = ? AND name = ?
+            """,
+            ["fetched" if ok else "failed", content_hash, size, time.time(), error] + params + [accession, name]
+        )
+
+    def record_clean(self, accession: str, name: str, ok: bool, clean_path: str = None,
+                     facts_path: str = None, error: str = None):
+        attempt, params = self._record_attempt(ok)
+        self._write(
+            f"""
+            UPDATE documents SET clean_status = ?, clean_path = ?, facts_path = ?,
+                   error = ?, claimed_by = NULL, lease_until = NULL, {attempt}
+            WHERE accession = ? AND name = ?
+            """,
+            ["cleaned" if ok else "failed", clean_path, facts_path, error] + params + [accession, name]
+        )
+
+    def requeue_failed(self) -> int:
+        """Gives failed documents that used every attempt a fresh set of retries."""
+        return self._write(
+            "UPDATE documents SET attempts = 0, retry_at = NULL WHERE fetch_status = 'failed' OR clean_status = 'failed'"
+        ).rowcount
+
+    def counts(self) -> dict:
+        rows = self.conn.execute(
+            "SELECT kind, fetch_status, COALESCE(clean_status, '-') AS clean_status, COUNT(*) AS n "
+            "FROM documents GROUP BY kind, fetch_status, clean_status"
+        ).fetchall()
+        return {f"{r['kind']}/{r['fetch_status']}/{r['clean_status']}": r["n"] for r in rows}
+
+    # --- Runs (GDELT / FRED / discovery outputs) ---
+
+    def record_run(self, source: str, kind: str, output_path: str, stamp: str = None):
+        self._write(
+            "INSERT INTO runs (source, kind, stamp, output_path, created_at) VALUES (?, ?, ?, ?, ?)",
+            (source, kind, stamp, output_path, time.time())
+        )
+
+    def latest_run(self, source: str, kind: str) -> Optional[sqlite3.Row]:
+        return self.conn.execute(
+            "SELECT * FROM runs WHERE source = ? AND kind = ? ORDER BY created_at DESC LIMIT 1",
+            (source, kind)
+        ).fetchone()
+
+    def forget(self, source: str):
+        """Drops catalog rows whose files the pipeline is about to delete."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            if source == "edgar":
+                self.conn.execute("DELETE FROM documents")
+                self.conn.execute("DELETE FROM filings")
+            self.conn.execute("DELETE FROM runs WHERE source = ?", (source,))
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
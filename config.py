@@ -11,6 +11,23 @@ if not USER_AGENT:
 DATA_DIR = "data"
 RAW_DIR = os.path.join(DATA_DIR, "raw")
 SUMMARY_DIR = os.path.join(DATA_DIR, "summary")
+# Persistent state (indexes, watermarks) that must survive pipeline cleanups
+STATE_DIR = os.path.join(DATA_DIR, "state")
+# Metadata catalog of filings, documents and run outputs shared by all stages
+CATALOG_DB = os.path.join(STATE_DIR, "catalog.db")
+# Failed fetch/clean documents are picked up again after CATALOG_RETRY_BACKOFF * 2^(attempts-1) seconds
+CATALOG_MAX_ATTEMPTS = 3
+CATALOG_RETRY_BACKOFF = 300
+
+# --- HTTP Runtime ---
+HTTP_MAX_CONCURRENCY = 16
+HTTP_CACHE_DIR = os.path.join(STATE_DIR, "http_cache")
+HTTP_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+# URL path prefixes whose responses never change (served from cache without revalidation)
+HTTP_CACHE_IMMUTABLE_PATHS = ["/Archives/edgar/data/"]
+SEC_REQUESTS_PER_SECOND = 8      # SEC fair access limit is 10/s across www and data
+FRED_REQUESTS_PER_SECOND = 2     # FRED allows 120 requests/minute
+GDELT_REQUESTS_PER_SECOND = 0.2  # GDELT asks for at most one request every 5 seconds
 
 # --- FRED Configuration ---
 FRED_API_KEY = os.getenv("FRED_API_KEY")
@@ -35,10 +52,58 @@ EDGAR_FORMS = {"10-K", "10-Q", "8-K"}
 EDGAR_DATA_DIR = os.path.join(DATA_DIR, "edgar")
 EDGAR_RAW_DIR = os.path.join(EDGAR_DATA_DIR, "raw")
 EDGAR_CLEAN_DIR = os.path.join(EDGAR_DATA_DIR, "clean")
+# Raw documents live in zstd-compressed, append-only pack files inside EDGAR_RAW_DIR
+EDGAR_STORE_DIR = EDGAR_RAW_DIR
+EDGAR_PACK_MAX_BYTES = 1024 * 1024 * 1024
+EDGAR_ZSTD_LEVEL = 10
+# How <table> elements are written to clean text: "rows" (non-empty cells per row), "markdown"
+# (aligned tables where a header row is detected) or None (legacy one-cell-per-line)
+EDGAR_TABLE_FORMAT = "rows"
+# Also export parsed tables to a <doc>.tables.jsonl sidecar
+EDGAR_TABLE_SIDECAR = False
+
+# Watchlist for bulk discovery via full-index/daily-index (ticker -> 10-digit CIK)
+EDGAR_WATCHLIST = {
+    "NVDA": "0001045810",
+}
+EDGAR_INDEX_DB = os.path.join(STATE_DIR, "edgar_index.db")
+EDGAR_INDEX_START_YEAR = 2024
+# A daily-index 404 on a weekday is only recorded as "no filings" once the day is this old
+EDGAR_DAILY_INDEX_GRACE_DAYS = 7
 
 
 # --- GDELT Configuration ---
 GDELT_BASE_URL = "https://api.gdeltproject.org/api/v2/doc/doc"
 GDELT_QUERY = "(NVDA OR NVIDIA) sourcelang:english"
+# Batch mode (gdelt.py --watchlist): search terms per EDGAR_WATCHLIST ticker besides the ticker itself
+GDELT_ALIASES = {
+    "NVDA": ["NVIDIA"],
+}
+GDELT_QUERY_SUFFIX = "sourcelang:english"
+GDELT_MAX_QUERY_LENGTH = 250  # characters per packed OR-query; GDELT rejects overly long queries
+GDELT_BATCH_CONCURRENCY = 2   # batch queries in flight (the GDELT host limiter still spaces requests)
+# Batch mode keeps its own store (high-water mark) and aggregates, apart from the single-query poll
+GDELT_WATCHLIST_STORE_DIR = os.path.join(STATE_DIR, "gdelt_watchlist")
+GDELT_WATCHLIST_AGGREGATES_DB = os.path.join(GDELT_WATCHLIST_STORE_DIR, "aggregates.db")
 GDELT_DATA_DIR = os.path.join(DATA_DIR, "gdelt")
+# Rolling store for incremental polling (gdelt.py --incremental/--continuous); kept across cleanups
+GDELT_STORE_DIR = os.path.join(STATE_DIR, "gdelt")
+GDELT_POLL_INTERVAL = 300         # seconds between polls in --continuous mode
+GDELT_INITIAL_LOOKBACK_HOURS = 24  # window of the very first poll
+# Rolling per-day/per-domain counters and timeline series, updated by each poll
+GDELT_AGGREGATES_DB = os.path.join(STATE_DIR, "gdelt_aggregates.db")
+GDELT_TIMELINES = ["TimelineTone", "TimelineVolRaw"]
+# Queue mode splits the backfill window into one work item per slice
+GDELT_BACKFILL_HOURS = 24
+GDELT_SLICE_HOURS = 6
+
+# --- Work Queue (pipeline --mode queue) ---
+# Single-host only: the queue (like the catalog and store) uses SQLite WAL, which needs every
+# worker process on the same machine; do not put STATE_DIR on a network filesystem
+QUEUE_DB = os.path.join(STATE_DIR, "queue.db")
+QUEUE_MAX_ATTEMPTS = 5
+QUEUE_VISIBILITY_TIMEOUT = 300  # seconds before a silent worker's item is handed to another worker
+QUEUE_RETRY_BACKOFF = 30        # first retry delay, doubled on each further attempt
+QUEUE_POLL_INTERVAL = 2
+QUEUE_WORKER_CONCURRENCY = 4
 
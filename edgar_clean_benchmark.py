@@ -0,0 +1,106 @@
+import os
+import sys
+import json
+import math
+import time
+from datetime import datetime, timezone
+import config
+from edgar_clean_text import convert_document, is_primary_html
+from edgar_store import PackStore
+
+SUMMARY_DIR = config.SUMMARY_DIR
+
+# Rough stand-in for the RAG chunker: fixed-size character chunks
+CHUNK_SIZE = 1000
+
+os.makedirs(SUMMARY_DIR, exist_ok=True)
+
+
+def measure(open_stream, table_format) -> dict:
+    """Times convert_document (what the cleaner writes) on the stream returned by open_stream()."""
+    start = time.perf_counter()
+    with open_stream() as stream:
+        text, _, _ = convert_document(stream, table_format=table_format)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "chars": len(text),
+        "lines": text.count("\n") + 1 if text else 0,
+        "chunks": math.ceil(len(text) / CHUNK_SIZE),
+        "seconds": round(elapsed, 3),
+    }
+
+
+def pct_change(before: int, after: int):
+    return round((after - before) / before * 100, 1) if before else None
+
+
+def stored_documents(store: PackStore):
+    for folder in store.filings():
+        for name in store.names(folder):
+            if is_primary_html(name):
+                yield f"{folder}/{name}", lambda folder=folder, name=name: store.open_text(folder, name)
+
+
+def local_documents(paths: list):
+    for path in paths:
+        yield path, lambda path=path: open(path, "r", encoding="utf-8", errors="ignore")
+
+
+def main():
+    """
+    Compares the legacy one-cell-per-line output with the table-aware output.
+    Benchmarks the raw store, or the HTML files given on the command line.
+    """
+    table_format = config.EDGAR_TABLE_FORMAT or "rows"
+    documents = []
+    totals = {"legacy": {"chars": 0, "lines": 0, "chunks": 0}, "tables": {"chars": 0, "lines": 0, "chunks": 0}}
+
+    store = None if len(sys.argv) > 1 else PackStore()
+    sources = local_documents(sys.argv[1:]) if store is None else stored_documents(store)
+
+    for label, open_stream in sources:
+        legacy = measure(open_stream, None)
+        tables = measure(open_stream, table_format)
+
+        for key in ("chars", "lines", "chunks"):
+            totals["legacy"][key] += legacy[key]
+            totals["tables"][key] += tables[key]
+
+        documents.append({"document": label, "legacy": legacy, "tables": tables})
+        print(
+            f"{label}: chars {legacy['chars']} -> {tables['chars']} "
+            f"({pct_change(legacy['chars'], tables['chars'])}%), "
+            f"chunks {legacy['chunks']} -> {tables['chunks']}"
+        )
+
+    if store is not None:
+        store.close()
+
+    if not documents:
+        print("No primary documents found. Run the EDGAR downloaders first.")
+        return
+
+    change = {key: pct_change(totals["legacy"][key], totals["tables"][key]) for key in ("chars", "lines", "chunks")}
+
+    print(f"\nDocuments: {len(documents)}")
+    for key in ("chars", "lines", "chunks"):
+        print(f" - {key}: {totals['legacy'][key]} -> {totals['tables'][key]} ({change[key]}%)")
+
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+    out_path = os.path.join(SUMMARY_DIR, f"edgar_clean_benchmark_{stamp}.json")
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "run_at_utc": stamp,
+            "table_format": table_format,
+            "chunk_size": CHUNK_SIZE,
+            "totals": totals,
+            "pct_change": change,
+            "documents": documents
+        }, f, ensure_ascii=False, indent=2)
+
+    print(f"\nSaved benchmark to: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
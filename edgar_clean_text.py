@@ -1,17 +1,33 @@
 import os
-from bs4 import BeautifulSoup
+import re
+import json
+import pandas as pd
+from bs4 import BeautifulSoup, NavigableString
 import config
+from catalog import Catalog, worker_id
+from edgar_store import PackStore
 
-RAW_DIR = config.EDGAR_RAW_DIR
 CLEAN_DIR = config.EDGAR_CLEAN_DIR
+TABLE_FORMAT = config.EDGAR_TABLE_FORMAT
+TABLE_SIDECAR = config.EDGAR_TABLE_SIDECAR
 
 os.makedirs(CLEAN_DIR, exist_ok=True)
 
+FACT_COLUMNS = [
+    "concept", "kind", "value", "text", "unit", "decimals",
+    "context_id", "period_start", "period_end", "dimensions", "fact_id"
+]
 
-def html_to_text(html_path: str) -> str:
-    with open(html_path, "r", encoding="utf-8", errors="ignore") as f:
-        soup = BeautifulSoup(f.read(), "lxml")
 
+def load_soup(source) -> BeautifulSoup:
+    """source is a file path or a text stream (e.g. PackStore.open_text)."""
+    if isinstance(source, str):
+        with open(source, "r", encoding="utf-8", errors="ignore") as f:
+            return BeautifulSoup(f.read(), "lxml")
+    return BeautifulSoup(source, "lxml")
+
+
+def soup_to_text(soup: BeautifulSoup) -> str:
     # remove script/style
     for tag in soup(["script", "style", "noscript"]):
         tag.decompose()
@@ -25,47 +41,372 @@ def html_to_text(html_path: str) -> str:
     return "\n".join(lines)
 
 
-def main():
-    filing_folders = sorted(os.listdir(RAW_DIR))
-    print(f"Scanning {len(filing_folders)} filing folders...\n")
+def html_to_text(source, table_format: str = TABLE_FORMAT) -> str:
+    soup = load_soup(source)
+    if table_format:
+        collapse_tables(soup, table_format)
+    return soup_to_text(soup)
+
+
+# --- Tables ---
+# Statement cells are split like "$" | "(1,234" | ")" in EDGAR HTML; glue them back together
+PREFIX_FRAGMENTS = {"$", "(", "$("}
+SUFFIX_FRAGMENTS = {")", "%", ")%", "%)"}
+
+# A data cell: amounts like $(1,234), 12.5%, -, or a bare number; four-digit years count as labels
+VALUE_RE = re.compile(r"^[$(\-–—]*\s*[\d,]*\.?\d+\s*\)?%?\)?$|^[\-–—]+$")
+YEAR_RE = re.compile(r"^(19|20)\d{2}$")
+
+
+def merge_cell_fragments(cells: list) -> list:
+    """
+    Merges "$" / ")" / "%" fragment cells into their neighbouring value cell,
+    in place: the fragment's own position becomes empty, so columns keep their index.
+    """
+    merged = list(cells)
+    for i, cell in enumerate(merged):
+        if cell in PREFIX_FRAGMENTS:
+            nxt = next((j for j in range(i + 1, len(merged)) if merged[j]), None)
+            if nxt is not None and merged[nxt] not in PREFIX_FRAGMENTS | SUFFIX_FRAGMENTS:
+                merged[nxt] = cell + merged[nxt]
+                merged[i] = ""
+        elif cell in SUFFIX_FRAGMENTS:
+            prev = next((j for j in range(i - 1, -1, -1) if merged[j]), None)
+            if prev is not None:
+                merged[prev] += cell
+                merged[i] = ""
+    return merged
+
+
+def cell_span(cell) -> int:
+    try:
+        return max(int(cell.get("colspan", 1)), 1)
+    except ValueError:
+        return 1
 
-    total_converted = 0
 
-    for folder in filing_folders:
-        folder_path = os.path.join(RAW_DIR, folder)
-        if not os.path.isdir(folder_path):
+def table_rows(table) -> list:
+    """
+    Reads a table into a grid that keeps every cell at its column position
+    (colspan expanded). Text of a spanning cell (period headers) is placed on
+    the first column of its span that holds values in other rows. Columns that
+    are empty in every row (spacers, merged-away "$" and ")") are dropped.
+    """
+    grid, spans = [], []
+    for tr in table.find_all("tr"):
+        row, col = [], 0
+        for cell in tr.find_all(["td", "th"]):
+            text = " ".join(cell.get_text(" ").split())
+            # "$ ( 1,234 )" from inline tags around the number -> "$(1,234)"
+            text = re.sub(r"([$(])\s+", r"\1", re.sub(r"\s+([)%])", r"\1", text))
+            width = cell_span(cell)
+            if width > 1:
+                spans.append((len(grid), col, width, text))
+                row += [""] * width
+            else:
+                row.append(text)
+            col += width
+        grid.append(merge_cell_fragments(row))
+
+    width = max((len(row) for row in grid), default=0)
+    grid = [row + [""] * (width - len(row)) for row in grid]
+    filled = {i for row in grid for i, cell in enumerate(row) if cell}
+
+    for r, start, span, text in spans:
+        if not text:
             continue
+        target = next((i for i in range(start, start + span) if i in filled), start)
+        grid[r][target] = f"{grid[r][target]} {text}".strip()
+
+    keep = [i for i in range(width) if any(row[i] for row in grid)]
+    return [[row[i] for i in keep] for row in grid if any(row[i] for i in keep)]
+
+
+def is_value(cell: str) -> bool:
+    return bool(VALUE_RE.match(cell)) and not YEAR_RE.match(cell)
+
+
+def split_header(rows: list) -> tuple:
+    """
+    Leading rows without any value cell are the header (merged column-wise into one
+    row), provided the body has values. Returns (header or None, body).
+    """
+    n = 0
+    while n < len(rows) and not any(is_value(c) for c in rows[n]):
+        n += 1
+    if n == 0 or n == len(rows):
+        return None, rows
+
+    header = [" ".join(c for c in col if c) for col in zip(*rows[:n])]
+    return header, rows[n:]
+
+
+def join_cells(row: list) -> str:
+    """
+    Non-empty cells of a row, separated by a space ("Net income $54,576 $(1,606)"):
+    values never contain spaces, so only two adjacent text cells need " | ".
+    """
+    cells = [c for c in row if c]
+    if not cells:
+        return ""
+    line = cells[0]
+    for prev, cell in zip(cells, cells[1:]):
+        line += (" " if is_value(prev) or is_value(cell) else " | ") + cell
+    return line
 
-        # find .htm files (primary docs)
-        htm_files = [
-            f for f in os.listdir(folder_path)
-            if (f.endswith(".htm") or f.endswith(".html"))
-            and not f.endswith("-index.html")
+
+def render_rows(rows: list) -> str:
+    return "\n".join(join_cells(row) for row in rows)
+
+
+def render_table(rows: list, table_format: str) -> str:
+    """
+    "rows": one line per row with the non-empty cells. "markdown": an aligned
+    Markdown table, used only when the table has a real header row (otherwise rows).
+    """
+    rows = [[c.replace("|", "/") for c in row] for row in rows]
+
+    header, body = split_header(rows) if table_format == "markdown" else (None, rows)
+    if header is None:
+        return render_rows(rows)
+
+    lines = ["| " + " | ".join(header) + " |", "|" + " --- |" * len(header)]
+    lines += ["| " + " | ".join(row) + " |" for row in body]
+    return "\n".join(lines)
+
+
+def collapse_tables(soup: BeautifulSoup, table_format: str) -> list:
+    """
+    Replaces every <table> with compact row-wise text (see render_table).
+    Tables without text are dropped; layout tables (no value cell: cover-page
+    checkboxes, bullets, signatures) become plain lines.
+    Returns the data tables as lists of rows for the optional sidecar.
+    """
+    tables = []
+
+    # innermost first, so nested tables are already flattened when their parent is read
+    for table in reversed(soup.find_all("table")):
+        rows = table_rows(table)
+
+        if not rows:
+            table.decompose()
+            continue
+
+        if not any(is_value(c) for row in rows for c in row):
+            text = "\n".join(" ".join(c for c in row if c) for row in rows)
+        else:
+            text = render_table(rows, table_format)
+            tables.append(rows)
+
+        table.replace_with(NavigableString("\n" + text + "\n"))
+
+    tables.reverse()
+    return tables
+
+
+# --- Inline XBRL facts ---
+# The lxml HTML parser lowercases tag and attribute names, e.g. ix:nonFraction -> ix:nonfraction
+
+def parse_contexts(soup: BeautifulSoup) -> dict:
+    contexts = {}
+    for ctx in soup.find_all("xbrli:context"):
+        start = ctx.find("xbrli:startdate")
+        end = ctx.find("xbrli:enddate")
+        if end is None:
+            end = ctx.find("xbrli:instant")
+
+        members = [
+            f"{m.get('dimension')}={m.get_text(strip=True)}"
+            for m in ctx.find_all(["xbrldi:explicitmember", "xbrldi:typedmember"])
         ]
 
-        if not htm_files:
+        contexts[ctx.get("id")] = {
+            "period_start": start.get_text(strip=True) if start is not None else None,
+            "period_end": end.get_text(strip=True) if end is not None else None,
+            "dimensions": ";".join(members) or None,
+        }
+    return contexts
+
+
+def parse_units(soup: BeautifulSoup) -> dict:
+    units = {}
+    for unit in soup.find_all("xbrli:unit"):
+        numerator = unit.find("xbrli:unitnumerator")
+        denominator = unit.find("xbrli:unitdenominator")
+        if numerator is not None and denominator is not None:
+            label = f"{numerator.get_text(strip=True)}/{denominator.get_text(strip=True)}"
+        else:
+            label = unit.get_text(strip=True)
+        units[unit.get("id")] = label
+    return units
+
+
+def parse_number(raw: str, fmt: str, scale: str, sign: str):
+    raw = raw.strip()
+    fmt = (fmt or "").lower()
+
+    if "zero" in fmt or raw in ("", "-", "—", "–"):
+        value = 0.0
+    else:
+        if "comma-decimal" in fmt or "numcommadecimal" in fmt:
+            raw = raw.replace(".", "").replace(" ", "").replace(",", ".")
+        else:
+            raw = raw.replace(",", "").replace(" ", "")
+        try:
+            value = float(raw)
+        except ValueError:
+            return None
+
+    if scale:
+        try:
+            value *= 10 ** int(scale)
+        except ValueError:
+            pass
+
+    return -value if sign == "-" else value
+
+
+def extract_ixbrl_facts(soup: BeautifulSoup) -> list:
+    """
+    Pulls ix:nonFraction / ix:nonNumeric facts with their resolved context and unit.
+    TextBlock facts are skipped: their content is already part of the clean text.
+    """
+    contexts = parse_contexts(soup)
+    units = parse_units(soup)
+
+    facts = []
+    for tag in soup.find_all(["ix:nonfraction", "ix:nonnumeric"]):
+        concept = tag.get("name")
+        if not concept or concept.endswith("TextBlock"):
             continue
 
-        out_folder = os.path.join(CLEAN_DIR, folder)
-        os.makedirs(out_folder, exist_ok=True)
+        ctx = contexts.get(tag.get("contextref"), {})
+        numeric = tag.name == "ix:nonfraction"
+        raw = tag.get_text(" ", strip=True)
 
-        for htm_file in htm_files:
-            in_path = os.path.join(folder_path, htm_file)
-            out_path = os.path.join(out_folder, htm_file + ".txt")
+        if numeric:
+            nil = tag.get("xsi:nil", "").lower() == "true"
+            value = None if nil else parse_number(raw, tag.get("format"), tag.get("scale"), tag.get("sign"))
+            text = None
+        else:
+            value = None
+            text = raw
 
-            if os.path.exists(out_path):
-                continue
+        facts.append({
+            "concept": concept,
+            "kind": "nonFraction" if numeric else "nonNumeric",
+            "value": value,
+            "text": text,
+            "unit": units.get(tag.get("unitref")),
+            "decimals": tag.get("decimals"),
+            "context_id": tag.get("contextref"),
+            "period_start": ctx.get("period_start"),
+            "period_end": ctx.get("period_end"),
+            "dimensions": ctx.get("dimensions"),
+            "fact_id": tag.get("id"),
+        })
+
+    return facts
+
+
+def convert_document(source, table_format: str = TABLE_FORMAT):
+    """
+    Single parse pass: extracts inline XBRL facts, then flattens the same soup to text.
+    The hidden ix:header (contexts, units) is dropped from the text afterwards.
+    Returns (text, facts, tables).
+    """
+    soup = load_soup(source)
+    facts = extract_ixbrl_facts(soup)
+
+    for tag in soup.find_all("ix:header"):
+        tag.decompose()
+
+    tables = collapse_tables(soup, table_format) if table_format else []
+
+    return soup_to_text(soup), facts, tables
+
+
+def save_tables(tables: list, out_path: str):
+    with open(out_path, "w", encoding="utf-8") as f:
+        for i, rows in enumerate(tables):
+            f.write(json.dumps({"table": i, "rows": rows}, ensure_ascii=False) + "\n")
+
+
+def save_facts(facts: list, out_path: str):
+    df = pd.DataFrame(facts, columns=FACT_COLUMNS)
+    df["value"] = pd.to_numeric(df["value"], errors="coerce")
+    df.to_parquet(out_path, index=False)
 
-            clean_text = html_to_text(in_path)
 
-            with open(out_path, "w", encoding="utf-8") as f:
-                f.write(clean_text)
+def lookup_facts(facts_path: str, concept: str, period_end: str = None) -> pd.DataFrame:
+    """Indexed lookup of one concept (e.g. 'us-gaap:Revenues') in a filing's facts table."""
+    filters = [("concept", "==", concept)]
+    if period_end:
+        filters.append(("period_end", "==", period_end))
+    return pd.read_parquet(facts_path, filters=filters)
+
+
+def is_primary_html(name: str) -> bool:
+    return (name.endswith(".htm") or name.endswith(".html")) and not name.endswith("-index.html")
+
+
+def clean_document(store: PackStore, doc) -> tuple:
+    """Converts one stored primary document; returns (text path, facts path, fact count)."""
+    folder, htm_file = doc["filing_key"], doc["name"]
+
+    out_folder = os.path.join(CLEAN_DIR, folder)
+    os.makedirs(out_folder, exist_ok=True)
+
+    out_path = os.path.join(out_folder, htm_file + ".txt")
+    facts_path = os.path.join(out_folder, htm_file + ".facts.parquet")
+
+    # decompressed straight from the pack file into the parser
+    with store.open_text(folder, htm_file) as stream:
+        clean_text, facts, tables = convert_document(stream)
+
+    with open(out_path, "w", encoding="utf-8") as f:
+        f.write(clean_text)
+
+    save_facts(facts, facts_path)
+
+    if TABLE_SIDECAR:
+        save_tables(tables, os.path.join(out_folder, htm_file + ".tables.jsonl"))
+
+    return out_path, facts_path, len(facts)
+
+
+def main():
+    catalog = Catalog()
+    store = PackStore()
+    worker = worker_id()
+
+    total_converted = 0
+    total_facts = 0
+
+    # documents needing cleaning, claimed in batches so parallel cleaners never overlap
+    while True:
+        docs = catalog.claim_documents("clean", worker, limit=50)
+        if not docs:
+            break
+
+        for doc in docs:
+            try:
+                out_path, facts_path, n_facts = clean_document(store, doc)
+            except Exception as e:
+                print(f"FAILED: {doc['filing_key']}/{doc['name']}: {e}")
+                catalog.record_clean(doc["accession"], doc["name"], False, error=str(e))
+                continue
+
+            catalog.record_clean(doc["accession"], doc["name"], True, out_path, facts_path)
 
             total_converted += 1
-            print(f"Converted: {in_path} -> {out_path}")
+            total_facts += n_facts
+            print(f"Converted: {doc['filing_key']}/{doc['name']} -> {out_path} ({n_facts} XBRL facts)")
 
-    print(f"\nDone. Total converted: {total_converted}")
+    store.close()
+    catalog.close()
+    print(f"\nDone. Total converted: {total_converted}, XBRL facts extracted: {total_facts}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
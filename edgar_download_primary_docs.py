@@ -1,35 +1,16 @@
-import os
-import time
-import requests
 from bs4 import BeautifulSoup
-import config
+from catalog import Catalog, worker_id
+from edgar_downloader_nvda import fetch_documents
+from edgar_store import PackStore
 
-SEC_USER_AGENT = config.USER_AGENT
 
-HEADERS = {
-    "User-Agent": SEC_USER_AGENT,
-    "Accept-Encoding": "gzip, deflate",
-}
-
-RAW_DIR = config.EDGAR_RAW_DIR
-
-
-def download_file(url: str, out_path: str):
-    r = requests.get(url, headers=HEADERS)
-    r.raise_for_status()
-
-    with open(out_path, "wb") as f:
-        f.write(r.content)
-
-
-def find_primary_doc(index_html_path: str, target_form: str):
+def find_primary_doc(index_html, target_form: str):
     """
-    Parses the EDGAR index.html file and finds the document
-    whose Type matches target_form (10-Q / 10-K / 8-K).
+    Parses the EDGAR index.html (a text stream from the raw store) and finds
+    the document whose Type matches target_form (10-Q / 10-K / 8-K).
     Returns the filename if found.
     """
-    with open(index_html_path, "r", encoding="utf-8", errors="ignore") as f:
-        soup = BeautifulSoup(f.read(), "lxml")
+    soup = BeautifulSoup(index_html, "lxml")
 
     table = soup.find("table", class_="tableFile", summary="Document Format Files")
     if not table:
@@ -55,71 +36,51 @@ def find_primary_doc(index_html_path: str, target_form: str):
     return None
 
 
-def main():
-    if not os.path.exists(RAW_DIR):
-        raise ValueError(f"{RAW_DIR} not found. Run the downloader first.")
+def resolve_primary_doc(catalog: Catalog, store: PackStore, filing) -> bool:
+    """Reads a fetched index page and queues the filing's primary document."""
+    key = filing["filing_key"]
+    target_form = filing["form"]
 
-    filing_folders = sorted(os.listdir(RAW_DIR))
-    print(f"Found {len(filing_folders)} filing folders.\n")
+    with store.open_text(key, filing["index_name"]) as index_html:
+        primary_doc_name = find_primary_doc(index_html, target_form)
 
-    for folder in filing_folders:
-        folder_path = os.path.join(RAW_DIR, folder)
-        if not os.path.isdir(folder_path):
-            continue
+    if not primary_doc_name:
+        print(f"[{key}] No primary doc found for form {target_form}")
+        catalog.set_primary(filing["accession"], None)
+        return False
 
-        files = os.listdir(folder_path)
-        index_files = [f for f in files if f.endswith("-index.html")]
+    # base url (with the filer's own CIK) comes from the catalog
+    primary_url = filing["base_url"] + primary_doc_name
+    catalog.set_primary(filing["accession"], primary_doc_name, primary_url)
 
-        if not index_files:
-            print(f"Skipping {folder} (no index.html found)")
-            continue
+    print(f"[{key}] Queued primary doc: {primary_doc_name}")
+    print(f"URL: {primary_url}")
+    return True
 
-        index_file = index_files[0]
-        index_path = os.path.join(folder_path, index_file)
 
-        # folder naming format: YYYY-MM-DD_FORM_ACCESSION
-        parts = folder.split("_")
-        if len(parts) < 2:
-            print(f"Skipping {folder} (unexpected folder name)")
-            continue
+def resolve_primary_docs(catalog: Catalog, store: PackStore) -> int:
+    return sum(resolve_primary_doc(catalog, store, filing) for filing in catalog.filings_needing_primary())
 
-        target_form = parts[1]
 
-        # base url is in the txt filename pattern
-        accession = index_file.replace("-index.html", "")
-        accession_no_dash = accession.replace("-", "")
-
-        # extract cik from folder structure? we hardcode NVDA cik no-zero
-        cik_no_zero = "1045810"
-
-        base_url = f"https://www.sec.gov/Archives/edgar/data/{cik_no_zero}/{accession_no_dash}/"
-
-        primary_doc_name = find_primary_doc(index_path, target_form)
-
-        if not primary_doc_name:
-            print(f"[{folder}] No primary doc found for form {target_form}")
-            continue
-
-        primary_url = base_url + primary_doc_name
-        out_path = os.path.join(folder_path, primary_doc_name)
-
-        if os.path.exists(out_path):
-            print(f"[{folder}] Already downloaded: {primary_doc_name}")
-            continue
+def main():
+    catalog = Catalog()
+    store = PackStore()
 
-        print(f"[{folder}] Downloading primary doc: {primary_doc_name}")
-        print(f"URL: {primary_url}")
+    try:
+        resolved = resolve_primary_docs(catalog, store)
+    finally:
+        store.close()
+    print(f"Resolved {resolved} primary docs.\n")
 
-        try:
-            download_file(primary_url, out_path)
-            print(f"Saved -> {out_path}\n")
-        except Exception as e:
-            print(f"FAILED: {e}\n")
+    docs = catalog.claim_documents("fetch", worker_id(), kinds=("primary",))
 
-        time.sleep(1.2)
+    # SEC rate limiting is enforced by the runtime's shared www/data.sec.gov limiter
+    print(f"Downloading {len(docs)} primary docs...")
+    fetch_documents(catalog, docs)
+    catalog.close()
 
     print("Done.")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,92 +1,73 @@
-import os
 import json
-import time
-import requests
-import sys
-from datetime import datetime, timezone
 import config
+from catalog import Catalog, worker_id
+from edgar_store import PackStore, fetch_into_store
+from http_runtime import HttpRuntime, map_bounded, run
 
-SEC_USER_AGENT = config.USER_AGENT
 
-HEADERS = {
-    "User-Agent": SEC_USER_AGENT,
-    "Accept-Encoding": "gzip, deflate",
-    "Host": "www.sec.gov"
-}
+async def fetch_document(runtime: HttpRuntime, store: PackStore, catalog: Catalog, doc):
+    # SEC rate limiting is enforced by the runtime's shared www/data.sec.gov limiter
+    filing, name = doc["filing_key"], doc["name"]
+    try:
+        if await fetch_into_store(runtime, store, filing, name, doc["url"]):
+            print(f"Stored -> {filing}/{name}")
+        else:
+            print(f"Already stored: {filing}/{name}")
 
-OUTPUT_DIR = config.EDGAR_RAW_DIR
+        content_hash, size = store.describe(filing, name)
+        catalog.record_fetch(doc["accession"], name, True, content_hash, size)
 
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+    except Exception as e:
+        print(f"FAILED {filing}/{name}: {e}")
+        catalog.record_fetch(doc["accession"], name, False, error=str(e))
 
 
+def fetch_documents(catalog: Catalog, docs: list):
+    """Fetches claimed catalog documents into the raw store and records the outcome."""
+    async def fetch_all():
+        async with HttpRuntime() as runtime:
+            await map_bounded(lambda doc: fetch_document(runtime, store, catalog, doc), docs)
 
-def safe_filename(name: str) -> str:
-    return name.replace("/", "_").replace("\\", "_")
+    store = PackStore()
+    try:
+        run(fetch_all())
+    finally:
+        store.close()
 
 
-def download_file(url: str, out_path: str):
-    r = requests.get(url, headers=HEADERS)
-    r.raise_for_status()
-
-    with open(out_path, "wb") as f:
-        f.write(r.content)
-
-
-def main(input_file=None):
-    if not input_file:
-        # Find the latest submissions file in EDGAR_DATA_DIR
-        files = [f for f in os.listdir(config.EDGAR_DATA_DIR) if f.startswith(f"{config.EDGAR_TICKER.lower()}_submissions_") and f.endswith(".json")]
-        if not files:
-             print("No submission file found.")
-             return
-        files.sort(reverse=True)
-        input_file = os.path.join(config.EDGAR_DATA_DIR, files[0])
-        print(f"Using latest submission file: {input_file}")
-
+def import_submissions(catalog: Catalog, input_file: str) -> int:
+    """Registers the filings of a submissions JSON file in the catalog."""
     with open(input_file, "r", encoding="utf-8") as f:
         payload = json.load(f)
 
     filings = payload.get("filings", [])
-    print(f"Total filings in input: {len(filings)}")
+    ticker = payload.get("ticker", config.EDGAR_TICKER)
+    cik = payload.get("cik", config.EDGAR_CIK)
+    return sum(catalog.upsert_filing(item, ticker, cik, "file") for item in filings)
 
-    limit = 10  # download only first 10 (most recent)
-    stamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
 
-    for i, filing in enumerate(filings[:limit], start=1):
-        accession = filing["accession_number"]
-        form = filing["form"]
-        filing_date = filing["filing_date"]
-
-        base_url = filing["filing_base_url"]
-        index_url = filing["index_html_url"]
-        txt_url = filing["full_text_url"]
-
-        folder_name = safe_filename(f"{filing_date}_{form}_{accession}")
-        filing_dir = os.path.join(OUTPUT_DIR, folder_name)
-        os.makedirs(filing_dir, exist_ok=True)
-
-        index_path = os.path.join(filing_dir, f"{accession}-index.html")
-        txt_path = os.path.join(filing_dir, f"{accession}.txt")
+def main(input_file=None):
+    catalog = Catalog()
 
-        print(f"\n[{i}/{limit}] Downloading {form} {filing_date} {accession}")
-        print(f"Index: {index_url}")
-        print(f"TXT:   {txt_url}")
+    if input_file:
+        new = import_submissions(catalog, input_file)
+        print(f"Imported {new} new filings from {input_file}")
 
-        try:
-            download_file(index_url, index_path)
-            print(f"Saved index -> {index_path}")
+    limit = 10  # download only 10 filings (most recent first) per run
 
-            download_file(txt_url, txt_path)
-            print(f"Saved txt   -> {txt_path}")
+    # index page + full submission text for each filing the discovery stage registered
+    docs = catalog.claim_documents("fetch", worker_id(), kinds=("index", "full_text"), limit=limit * 2)
+    print(f"Documents to download: {len(docs)}")
 
-        except Exception as e:
-            print(f"FAILED: {e}")
+    for i, doc in enumerate(docs, start=1):
+        print(f"[{i}/{len(docs)}] {doc['form']} {doc['filing_date']} {doc['accession']} {doc['kind']}")
+        print(f"URL: {doc['url']}")
 
-        # SEC rate limiting safety
-        time.sleep(1.2)
+    fetch_documents(catalog, docs)
+    catalog.close()
 
     print("\nDone.")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
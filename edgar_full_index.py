@@ -0,0 +1,319 @@
+import os
+import gzip
+import json
+import sqlite3
+import tempfile
+from datetime import date, datetime, timedelta, timezone
+import config
+from catalog import Catalog
+from http_runtime import HttpRuntime, map_bounded, run
+
+FULL_INDEX_URL = "https://www.sec.gov/Archives/edgar/full-index/{year}/QTR{qtr}/master.gz"
+DAILY_INDEX_URL = "https://www.sec.gov/Archives/edgar/daily-index/{year}/QTR{qtr}/master.{day}.idx"
+
+DB_PATH = config.EDGAR_INDEX_DB
+DATA_DIR = config.EDGAR_DATA_DIR
+BATCH_SIZE = 5000
+
+os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+os.makedirs(DATA_DIR, exist_ok=True)
+
+STAMP = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS filings (
+    cik         TEXT NOT NULL,
+    company     TEXT,
+    form        TEXT NOT NULL,
+    date_filed  TEXT NOT NULL,
+    accession   TEXT NOT NULL,
+    filename    TEXT NOT NULL,
+    PRIMARY KEY (cik, accession)
+);
+CREATE INDEX IF NOT EXISTS idx_filings_cik_form_date ON filings (cik, form, date_filed);
+CREATE INDEX IF NOT EXISTS idx_filings_date ON filings (date_filed);
+
+CREATE TABLE IF NOT EXISTS index_files (
+    url         TEXT PRIMARY KEY,
+    rows        INTEGER,
+    ingested_at TEXT
+);
+"""
+
+
+def connect(db_path: str = DB_PATH) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def quarter_of(d: date) -> int:
+    return (d.month - 1) // 3 + 1
+
+
+def quarter_start(year: int, qtr: int) -> date:
+    return date(year, 3 * (qtr - 1) + 1, 1)
+
+
+def quarter_end(year: int, qtr: int) -> date:
+    if qtr == 4:
+        return date(year, 12, 31)
+    return quarter_start(year, qtr + 1) - timedelta(days=1)
+
+
+def iter_quarters(start_year: int, today: date):
+    """Yields (year, qtr) from start_year Q1 up to and including the current quarter."""
+    year, qtr = start_year, 1
+    while (year, qtr) <= (today.year, quarter_of(today)):
+        yield year, qtr
+        qtr += 1
+        if qtr > 4:
+            year, qtr = year + 1, 1
+
+
+def parse_master_lines(lines):
+    """
+    Streams rows out of an EDGAR master index file.
+    Format after the dashed header line: CIK|Company Name|Form Type|Date Filed|Filename
+    Yields (cik, company, form, date_filed, accession, filename) with a 10-digit CIK
+    and an ISO date (daily files use YYYYMMDD).
+    """
+    in_body = False
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if not in_body:
+            if line.startswith("-----"):
+                in_body = True
+            continue
+
+        parts = line.split("|")
+        if len(parts) != 5:
+            continue
+
+        cik, company, form, date_filed, filename = parts
+        if len(date_filed) == 8 and date_filed.isdigit():
+            date_filed = f"{date_filed[:4]}-{date_filed[4:6]}-{date_filed[6:]}"
+
+        # "edgar/data/1045810/0001045810-24-000029.txt" -> "0001045810-24-000029"
+        accession = os.path.basename(filename).replace(".txt", "")
+
+        yield cik.zfill(10), company, form, date_filed, accession, filename
+
+
+def ingest_stream(conn: sqlite3.Connection, lines) -> int:
+    """Inserts parsed rows in batches so the index file never has to sit in memory."""
+    total = 0
+    batch = []
+    for row in parse_master_lines(lines):
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            conn.executemany("INSERT OR IGNORE INTO filings VALUES (?, ?, ?, ?, ?, ?)", batch)
+            total += len(batch)
+            batch = []
+
+    if batch:
+        conn.executemany("INSERT OR IGNORE INTO filings VALUES (?, ?, ?, ?, ?, ?)", batch)
+        total += len(batch)
+
+    return total
+
+
+def already_ingested(conn: sqlite3.Connection, url: str) -> bool:
+    row = conn.execute("SELECT 1 FROM index_files WHERE url = ?", (url,)).fetchone()
+    return row is not None
+
+
+def mark_ingested(conn: sqlite3.Connection, url: str, rows: int):
+    conn.execute(
+        "INSERT OR REPLACE INTO index_files VALUES (?, ?, ?)",
+        (url, rows, datetime.now(timezone.utc).isoformat())
+    )
+
+
+async def ingest_url(runtime: HttpRuntime, conn: sqlite3.Connection, url: str, compressed: bool,
+                     final: bool = True):
+    """
+    Downloads one index file to a temp file and ingests it while streaming it back.
+    Only a `final` file is marked ingested; others are ingested again on the next
+    run (rows are INSERT OR IGNORE, so that only adds what is new).
+    Returns the number of rows, or None on 404 (no file for that day, or not published yet).
+    Any other error status, including SEC's 403 rate-limit/User-Agent block, raises HttpError.
+    """
+    fd, tmp_path = tempfile.mkstemp(suffix=".idx", dir=os.path.dirname(DB_PATH))
+    os.close(fd)
+
+    try:
+        # read once and never requested again after ingest; keep them out of the response cache
+        r = await runtime.download(url, tmp_path, cache=False)
+        if r.status == 404:
+            return None
+        r.raise_for_status()
+
+        opener = gzip.open if compressed else open
+        with opener(tmp_path, "rt", encoding="latin-1", newline="") as lines:
+            with conn:
+                rows = ingest_stream(conn, lines)
+                if final:
+                    mark_ingested(conn, url, rows)
+    finally:
+        os.remove(tmp_path)
+
+    return rows
+
+
+def pending_index_files(conn: sqlite3.Connection, start_year: int) -> list:
+    """
+    Completed quarters are ingested once from full-index (immutable once final).
+    The current quarter is filled from daily-index files, one per calendar day so far.
+    Returns (url, compressed, day) tuples not yet ingested; for full-index files day
+    is the last day of the quarter.
+    """
+    today = datetime.now(timezone.utc).date()
+    current = (today.year, quarter_of(today))
+    pending = []
+
+    for year, qtr in iter_quarters(start_year, today):
+        if (year, qtr) != current:
+            pending.append((FULL_INDEX_URL.format(year=year, qtr=qtr), True, quarter_end(year, qtr)))
+            continue
+
+        day = quarter_start(year, qtr)
+        while day < today:
+            pending.append((DAILY_INDEX_URL.format(year=year, qtr=qtr, day=day.strftime("%Y%m%d")), False, day))
+            day += timedelta(days=1)
+
+    return [item for item in pending if not already_ingested(conn, item[0])]
+
+
+def is_settled(day: date, today: date) -> bool:
+    """
+    SEC publishes a day's filings in the US/Eastern evening, so anything about a
+    recent day (its daily file, or the full-index of a quarter that just ended)
+    may still be incomplete and is fetched again on the next run.
+    """
+    return (today - day).days > config.EDGAR_DAILY_INDEX_GRACE_DAYS
+
+
+def is_final_404(day: date, today: date) -> bool:
+    """A missing daily index is only final for weekends or days well in the past."""
+    return day.weekday() >= 5 or is_settled(day, today)
+
+
+async def update_index(conn: sqlite3.Connection, start_year: int = config.EDGAR_INDEX_START_YEAR):
+    pending = pending_index_files(conn, start_year)
+    print(f"Index files to ingest: {len(pending)}")
+
+    today = datetime.now(timezone.utc).date()
+
+    async def ingest(item):
+        url, compressed, day = item
+        full_index = compressed  # only full-index files are gzipped
+        # a just-closed quarter's master.gz may miss its last days until SEC catches up
+        final = not full_index or is_settled(day, today)
+        rows = await ingest_url(runtime, conn, url, compressed, final)
+        if rows is None:
+            if not full_index and is_final_404(day, today):
+                # No file for this day (weekend/holiday); remember so we don't ask again
+                with conn:
+                    mark_ingested(conn, url, 0)
+            else:
+                print(f"Not published yet: {url} (will retry)")
+        else:
+            print(f"Ingested: {url} ({rows} rows)" + ("" if final else " (quarter just closed, will re-check)"))
+
+    # Downloads overlap under the SEC rate limit; SQLite writes stay on the loop thread
+    async with HttpRuntime() as runtime:
+        results = await map_bounded(ingest, pending, limit=4, return_exceptions=True)
+
+    # failed files stay unmarked, so the next run retries them
+    errors = [(item[0], e) for item, e in zip(pending, results) if isinstance(e, Exception)]
+    for url, e in errors:
+        print(f"FAILED: {url}: {e}")
+    if errors:
+        raise RuntimeError(f"{len(errors)} index files failed to download")
+
+
+def new_filings(conn: sqlite3.Connection, ciks, forms, known=(), since_date: str = None):
+    """
+    Watchlist filings in a single indexed query, minus the accessions in `known`
+    (the ones the catalog already has). Basing "new" on the catalog means a
+    pipeline cleanup that empties the catalog gets every filing registered again.
+    """
+    ciks = list(ciks)
+    forms = list(forms)
+
+    sql = f"""
+        SELECT rowid, cik, company, form, date_filed, accession, filename
+        FROM filings
+        WHERE cik IN ({",".join("?" * len(ciks))})
+          AND form IN ({",".join("?" * len(forms))})
+    """
+    params = ciks + forms
+
+    if since_date:
+        sql += " AND date_filed >= ?"
+        params.append(since_date)
+
+    sql += " ORDER BY date_filed DESC, accession DESC"
+    known = set(known)
+    return [row for row in conn.execute(sql, params) if row[5] not in known]
+
+
+def to_submission_item(row) -> dict:
+    # Same shape as the items produced by edgar_submissions_nvda
+    _, cik, _, form, date_filed, accession, _ = row
+    base_url = f"https://www.sec.gov/Archives/edgar/data/{int(cik)}/{accession.replace('-', '')}/"
+    return {
+        "accession_number": accession,
+        "form": form,
+        "filing_date": date_filed,
+        "primary_document": None,
+        "filing_base_url": base_url,
+        "index_html_url": base_url + f"{accession}-index.html",
+        "full_text_url": base_url + f"{accession}.txt"
+    }
+
+
+def main():
+    conn = connect()
+    run(update_index(conn))
+
+    since_date = f"{config.EDGAR_INDEX_START_YEAR}-01-01"
+    watchlist = config.EDGAR_WATCHLIST
+    catalog = Catalog()
+
+    known = catalog.accessions(watchlist.values())
+    rows = new_filings(conn, watchlist.values(), config.EDGAR_FORMS, known, since_date)
+    print(f"\nWatchlist filings not in the catalog yet: {len(rows)}")
+
+    by_cik = {}
+    for row in rows:
+        by_cik.setdefault(row[1], []).append(row)
+
+    for ticker, cik in watchlist.items():
+        filings = [to_submission_item(row) for row in by_cik.get(cik, [])]
+        for item in filings:
+            catalog.upsert_filing(item, ticker, cik, "full-index")
+        for item in filings:
+            print(f"  {ticker} | {item['filing_date']} | {item['form']} | {item['accession_number']}")
+
+        out_path = os.path.join(DATA_DIR, f"{ticker.lower()}_submissions_{STAMP}.json")
+        with open(out_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "ticker": ticker,
+                "cik": cik,
+                "fetched_at_utc": STAMP,
+                "source": "full-index",
+                "count": len(filings),
+                "filings": filings
+            }, f, ensure_ascii=False, indent=2)
+
+        catalog.record_run("edgar", "submissions", out_path, STAMP)
+        print(f"Saved output to: {out_path}")
+
+    catalog.close()
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
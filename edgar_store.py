@@ -0,0 +1,212 @@
+import os
+import io
+import time
+import asyncio
+import sqlite3
+import hashlib
+import tempfile
+import threading
+import zstandard as zstd
+import config
+
+STORE_DIR = config.EDGAR_STORE_DIR
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    hash     TEXT PRIMARY KEY,
+    pack     TEXT NOT NULL,
+    offset   INTEGER NOT NULL,
+    length   INTEGER NOT NULL,
+    raw_size INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS documents (
+    filing    TEXT NOT NULL,
+    name      TEXT NOT NULL,
+    hash      TEXT NOT NULL REFERENCES objects (hash),
+    stored_at REAL NOT NULL,
+    PRIMARY KEY (filing, name)
+);
+CREATE INDEX IF NOT EXISTS idx_documents_hash ON documents (hash);
+"""
+
+
+class PackSlice(io.RawIOBase):
+    """Read-only view of [offset, offset + length) inside a pack file."""
+
+    def __init__(self, path: str, offset: int, length: int):
+        self.f = open(path, "rb")
+        self.f.seek(offset)
+        self.remaining = length
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = min(len(buffer), self.remaining)
+        if n <= 0:
+            return 0
+        data = self.f.read(n)
+        buffer[:len(data)] = data
+        self.remaining -= len(data)
+        return len(data)
+
+    def close(self):
+        self.f.close()
+        super().close()
+
+
+class PackStore:
+    """
+    Raw-document store for EDGAR filings: zstd-compressed blobs appended to pack files,
+    with an SQLite index of (pack, offset, length) per content hash.
+    Documents are addressed by (filing, name), where filing is the
+    YYYY-MM-DD_FORM_ACCESSION key; identical content is stored once.
+    """
+
+    def __init__(self, root: str = STORE_DIR, pack_max_bytes: int = config.EDGAR_PACK_MAX_BYTES,
+                 level: int = config.EDGAR_ZSTD_LEVEL):
+        self.root = root
+        self.pack_max_bytes = pack_max_bytes
+        self.level = level
+        os.makedirs(root, exist_ok=True)
+
+        # autocommit mode so writers can take an explicit BEGIN IMMEDIATE lock;
+        # compression runs in worker threads, so writes are also serialised in-process
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(root, "store.db"), isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    # --- Reads ---
+
+    def exists(self, filing: str, name: str) -> bool:
+        row = self.conn.execute(
+            "SELECT 1 FROM documents WHERE filing = ? AND name = ?", (filing, name)
+        ).fetchone()
+        return row is not None
+
+    def filings(self) -> list:
+        return [r[0] for r in self.conn.execute("SELECT DISTINCT filing FROM documents ORDER BY filing")]
+
+    def names(self, filing: str) -> list:
+        return [r[0] for r in self.conn.execute(
+            "SELECT name FROM documents WHERE filing = ? ORDER BY name", (filing,)
+        )]
+
+    def _locate(self, filing: str, name: str):
+        row = self.conn.execute(
+            """
+            SELECT o.pack, o.offset, o.length FROM documents d
+            JOIN objects o ON o.hash = d.hash
+            WHERE d.filing = ? AND d.name = ?
+            """,
+            (filing, name)
+        ).fetchone()
+        if row is None:
+            raise KeyError(f"{filing}/{name} not in store")
+        return row
+
+    def open(self, filing: str, name: str):
+        """Binary stream that decompresses the document as it is read."""
+        pack, offset, length = self._locate(filing, name)
+        source = PackSlice(os.path.join(self.root, pack), offset, length)
+        return zstd.ZstdDecompressor().stream_reader(source, closefd=True)
+
+    def open_text(self, filing: str, name: str):
+        return io.TextIOWrapper(self.open(filing, name), encoding="utf-8", errors="ignore")
+
+    def describe(self, filing: str, name: str):
+        """(content_hash, raw_size) of a stored document, or None."""
+        return self.conn.execute(
+            """
+            SELECT d.hash, o.raw_size FROM documents d
+            JOIN objects o ON o.hash = d.hash
+            WHERE d.filing = ? AND d.name = ?
+            """,
+            (filing, name)
+        ).fetchone()
+
+    def read_bytes(self, filing: str, name: str) -> bytes:
+        with self.open(filing, name) as f:
+            return f.read()
+
+    # --- Writes ---
+
+    def _current_pack(self) -> str:
+        packs = sorted(f for f in os.listdir(self.root) if f.startswith("pack-") and f.endswith(".zst"))
+        if packs and os.path.getsize(os.path.join(self.root, packs[-1])) < self.pack_max_bytes:
+            return packs[-1]
+        return f"pack-{len(packs) + 1:06d}.zst"
+
+    def put_file(self, filing: str, name: str, src_path: str) -> str:
+        """Stores a file (hash pass, then streaming compression). Returns the content hash."""
+        digest = hashlib.sha256()
+        with open(src_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        content_hash = digest.hexdigest()
+
+        with self.lock:
+            self._append(filing, name, src_path, content_hash)
+        return content_hash
+
+    def _append(self, filing: str, name: str, src_path: str, content_hash: str):
+        # BEGIN IMMEDIATE serialises appenders across processes
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            known = self.conn.execute("SELECT 1 FROM objects WHERE hash = ?", (content_hash,)).fetchone()
+            if not known:
+                pack = self._current_pack()
+                with open(src_path, "rb") as src, open(os.path.join(self.root, pack), "ab") as dst:
+                    offset = dst.tell()
+                    zstd.ZstdCompressor(level=self.level).copy_stream(src, dst)
+                    length = dst.tell() - offset
+
+                self.conn.execute(
+                    "INSERT INTO objects VALUES (?, ?, ?, ?, ?)",
+                    (content_hash, pack, offset, length, os.path.getsize(src_path))
+                )
+
+            self.conn.execute(
+                "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?)",
+                (filing, name, content_hash, time.time())
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def stats(self) -> dict:
+        docs, objects, raw, packed = self.conn.execute(
+            """
+            SELECT (SELECT COUNT(*) FROM documents), COUNT(*),
+                   COALESCE(SUM(raw_size), 0), COALESCE(SUM(length), 0)
+            FROM objects
+            """
+        ).fetchone()
+        return {"documents": docs, "objects": objects, "raw_bytes": raw, "packed_bytes": packed}
+
+
+async def fetch_into_store(runtime, store: PackStore, filing: str, name: str, url: str) -> bool:
+    """
+    Downloads url through the HTTP runtime into a temp file and packs it.
+    Returns False if the document was already stored.
+    """
+    if store.exists(filing, name):
+        return False
+
+    fd, tmp_path = tempfile.mkstemp(suffix=".part", dir=store.root)
+    os.close(fd)
+
+    try:
+        r = await runtime.download(url, tmp_path)
+        r.raise_for_status()
+        await asyncio.to_thread(store.put_file, filing, name, tmp_path)
+    finally:
+        os.remove(tmp_path)
+
+    return True
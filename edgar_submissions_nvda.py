@@ -1,8 +1,9 @@
 import os
 import json
-import requests
 from datetime import datetime, timezone
 import config
+from catalog import Catalog
+from http_runtime import HttpRuntime, run
 
 SEC_USER_AGENT = config.USER_AGENT
 
@@ -11,12 +12,6 @@ CIK_NO_ZERO = config.EDGAR_CIK_NO_ZERO     # same CIK but without leading zeros
 
 SUBMISSIONS_URL = f"https://data.sec.gov/submissions/CIK{CIK}.json"
 
-HEADERS = {
-    "User-Agent": SEC_USER_AGENT,
-    "Accept-Encoding": "gzip, deflate",
-    "Host": "data.sec.gov"
-}
-
 DATA_DIR = config.EDGAR_DATA_DIR
 os.makedirs(DATA_DIR, exist_ok=True)
 
@@ -33,16 +28,21 @@ def build_filing_base_url(accession_number: str) -> str:
     return f"https://www.sec.gov/Archives/edgar/data/{CIK_NO_ZERO}/{folder}/"
 
 
+async def fetch_submissions() -> dict:
+    # SEC headers and rate limit come from the runtime's data.sec.gov policy
+    async with HttpRuntime() as runtime:
+        r = await runtime.get(SUBMISSIONS_URL)
+        r.raise_for_status()
+        return r.json()
+
+
 def main():
     TARGET_FORMS = config.EDGAR_FORMS
 
     print(f"Filtering for forms: {TARGET_FORMS}\n")
     print(f"Requesting: {SUBMISSIONS_URL}\n")
 
-    r = requests.get(SUBMISSIONS_URL, headers=HEADERS)
-    r.raise_for_status()
-
-    data = r.json()
+    data = run(fetch_submissions())
 
     filings_recent = data.get("filings", {}).get("recent", {})
     accession_numbers = filings_recent.get("accessionNumber", [])
@@ -115,6 +115,13 @@ def main():
 
     print(f"Saved output to: {out_path}")
 
+    catalog = Catalog()
+    new = sum(catalog.upsert_filing(item, config.EDGAR_TICKER, CIK, "submissions") for item in results)
+    catalog.record_run("edgar", "submissions", out_path, STAMP)
+    catalog.close()
+
+    print(f"Registered {new} new filings in the catalog")
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
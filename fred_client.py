@@ -1,15 +1,15 @@
-import requests
 import pandas as pd
 import config
+from http_runtime import HttpRuntime, HttpError, run
 
 class FredClient:
     def __init__(self, api_key: str = config.FRED_API_KEY):
         self.api_key = api_key
         self.base_url = config.FRED_BASE_URL
 
-    def fetch_series(self, series_id: str, start_date: str = config.FRED_START_DATE) -> pd.DataFrame:
+    async def fetch_series_async(self, runtime: HttpRuntime, series_id: str, start_date: str = config.FRED_START_DATE) -> pd.DataFrame:
         """
-        Fetches a specific series from FRED API and returns a DataFrame.
+        Fetches a specific series from FRED API through the shared runtime and returns a DataFrame.
         """
         params = {
             "series_id": series_id,
@@ -19,9 +19,9 @@ class FredClient:
         }
 
         try:
-            response = requests.get(self.base_url, params=params)
+            response = await runtime.get(self.base_url, params=params)
             response.raise_for_status()
-            
+
             data = response.json()
             observations = data.get("observations", [])
 
@@ -35,6 +35,17 @@ class FredClient:
             
             return df
 
-        except requests.exceptions.RequestException as e:
+        except (HttpError, ValueError) as e:
+            # ValueError covers a non-JSON body (JSONDecodeError), so one bad series is skipped
             print(f"Error fetching series {series_id}: {e}")
             return pd.DataFrame()
+
+    def fetch_series(self, series_id: str, start_date: str = config.FRED_START_DATE) -> pd.DataFrame:
+        """
+        Blocking wrapper around fetch_series_async for one-off calls.
+        """
+        async def fetch():
+            async with HttpRuntime() as runtime:
+                return await self.fetch_series_async(runtime, series_id, start_date)
+
+        return run(fetch())
@@ -5,7 +5,9 @@ from datetime import datetime
 from typing import List, Dict, Optional
 
 import config
+from catalog import Catalog
 from fred_client import FredClient
+from http_runtime import HttpRuntime, map_bounded, run
 
 class FredCollector:
     def __init__(self):
@@ -71,37 +73,40 @@ class FredCollector:
             }
         return None
 
-    def run(self):
-        print("Fetching FRED series...\n")
-        dataframes = {}
-        summaries = []
-
-        for sid in config.FRED_SERIES_LIST:
-            df = self.client.fetch_series(sid)
-            if df.empty:
-                print(f"Skipping {sid} due to empty data.")
-                continue
-
-            dataframes[sid] = df
-
-            # Save raw observations
-            raw_payload = {
-                "series_id": sid,
-                "source": "FRED",
-                "fetched_at_utc": self.stamp,
-                "observations": [
-                    {"date": str(row["date"].date()), "value": float(row["value"])}
-                    for _, row in df.iterrows()
-                ]
-            }
+    async def fetch_all(self, series_ids: List[str]) -> Dict[str, pd.DataFrame]:
+        """Fetches all series concurrently; the runtime enforces FRED's rate limit."""
+        async with HttpRuntime() as runtime:
+            frames = await map_bounded(
+                lambda sid: self.client.fetch_series_async(runtime, sid),
+                series_ids
+            )
+        return dict(zip(series_ids, frames))
+
+    def save_raw(self, sid: str, df: pd.DataFrame, catalog: Catalog) -> str:
+        # Save raw observations
+        raw_payload = {
+            "series_id": sid,
+            "source": "FRED",
+            "fetched_at_utc": self.stamp,
+            "observations": [
+                {"date": str(row["date"].date()), "value": float(row["value"])}
+                for _, row in df.iterrows()
+            ]
+        }
 
-            raw_path = os.path.join(config.RAW_DIR, f"{sid}_{self.stamp}.json")
-            self.save_json(raw_path, raw_payload)
+        raw_path = os.path.join(config.RAW_DIR, f"{sid}_{self.stamp}.json")
+        self.save_json(raw_path, raw_payload)
+        catalog.record_run("fred", f"raw:{sid}", raw_path, self.stamp)
+        return raw_path
 
-            summary = self.summarize_last_12(df, sid)
-            summaries.append(summary)
+    def load_raw(self, raw_path: str) -> pd.DataFrame:
+        with open(raw_path, "r", encoding="utf-8") as f:
+            df = pd.DataFrame(json.load(f)["observations"], columns=["date", "value"])
+        df["date"] = pd.to_datetime(df["date"])
+        return df
 
-            print(f"{sid} -> saved {len(df)} observations to {raw_path}")
+    def save_report(self, dataframes: Dict[str, pd.DataFrame], catalog: Catalog) -> str:
+        summaries = [self.summarize_last_12(df, sid) for sid, df in dataframes.items()]
 
         # Yield curve calculation
         yield_curve_info = self.calculate_yield_curve(dataframes)
@@ -118,6 +123,29 @@ class FredCollector:
 
         report_path = os.path.join(config.SUMMARY_DIR, f"macro_report_{self.stamp}.json")
         self.save_json(report_path, report)
+        catalog.record_run("fred", "summary", report_path, self.stamp)
+        return report_path
+
+    def run(self):
+        print("Fetching FRED series...\n")
+        dataframes = {}
+        catalog = Catalog()
+
+        fetched = run(self.fetch_all(config.FRED_SERIES_LIST))
+
+        for sid in config.FRED_SERIES_LIST:
+            df = fetched[sid]
+            if df.empty:
+                print(f"Skipping {sid} due to empty data.")
+                continue
+
+            dataframes[sid] = df
+            raw_path = self.save_raw(sid, df, catalog)
+
+            print(f"{sid} -> saved {len(df)} observations to {raw_path}")
+
+        report_path = self.save_report(dataframes, catalog)
+        catalog.close()
 
         print("\n--- Saved Macro Report ---")
         print(report_path)
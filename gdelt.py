@@ -1,13 +1,18 @@
 import os
+import sys
+import asyncio
 import logging
-import requests
+import argparse
 import json
 from datetime import datetime, timezone, timedelta
 import urllib.parse
 from collections import Counter
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 import config
+from catalog import Catalog
+from gdelt_aggregates import Aggregates, parse_seendates
+from gdelt_batch import EntityMatcher, build_matcher, entity_terms, pack_queries, route, split_query
+from gdelt_store import ArticleStore, seendate_to_gdelt
+from http_runtime import HttpRuntime, map_bounded, run
 
 # Setup logging
 logging.basicConfig(
@@ -19,53 +24,57 @@ logger = logging.getLogger(__name__)
 BASE_URL = config.GDELT_BASE_URL
 QUERY = config.GDELT_QUERY
 MODE = "ArtList"
+# Aggregates key for the single configured query
+ENTITY = config.EDGAR_TICKER
+TITLE_MATCHER = build_matcher(entity_terms([ENTITY]))
 FORMAT = "json"
 MAX_RECORDS = 50
+PAGE_SIZE = 250  # GDELT's maxrecords ceiling, used when paging forward
 DATA_DIR = config.GDELT_DATA_DIR
 
 # Ensure output directory exists
 os.makedirs(DATA_DIR, exist_ok=True)
 
-# last 7 days
-START_DATETIME = (datetime.now(timezone.utc).replace(microsecond=0)).strftime("%Y%m%d%H%M%S")
 
-# Manually construct URL to control encoding
-# We used to hardcode "(NVDA OR NVIDIA) sourcelang:english", now we use config
-# But config.GDELT_QUERY is the full string. We expect the user to have put the right query in config.
-QUERY_STRING = config.GDELT_QUERY
-encoded_query = urllib.parse.quote(QUERY_STRING)
+def build_url(query: str = QUERY, start: str = None, end: str = None,
+              max_records: int = MAX_RECORDS, sort: str = "datedesc", mode: str = MODE) -> str:
+    """
+    Manually construct URL to control encoding.
+    start/end are GDELT datetimes (YYYYMMDDHHMMSS) bounding the search window.
+    """
+    encoded_query = urllib.parse.quote(query)
+    url = f"{BASE_URL}?query={encoded_query}&mode={mode}&format={FORMAT}"
+    if mode == MODE:
+        url += f"&maxrecords={max_records}&sort={sort}"
+    if start:
+        url += f"&startdatetime={start}"
+    if end:
+        url += f"&enddatetime={end}"
+    return url
 
-url = f"{BASE_URL}?query={encoded_query}&mode={MODE}&format={FORMAT}&maxrecords={MAX_RECORDS}&sort=datedesc"
 
-logger.info(f"Requesting URL: {url}")
+async def fetch_articles(runtime: HttpRuntime, url: str) -> list:
+    # Retries, backoff and GDELT's rate limit come from the shared HTTP runtime policy
+    logger.info(f"Requesting URL: {url}")
+    r = await runtime.get(url)
+    r.raise_for_status()
+    return r.json().get("articles", [])
 
-# Setup Retry logic
-session = requests.Session()
-retries = Retry(total=5, backoff_factor=2, status_forcelist=[429, 500, 502, 503, 504])
-session.mount('https://', HTTPAdapter(max_retries=retries))
 
-try:
-    r = session.get(url, timeout=10)
+async def fetch_timeline(runtime: HttpRuntime, url: str) -> list:
+    """Timeline modes (TimelineTone, TimelineVolRaw) -> [(YYYYMMDDTHHMMSSZ, value)] of the first series."""
+    r = await runtime.get(url)
     r.raise_for_status()
-    data = r.json()
-except Exception as e:
-    logger.error(f"Failed to fetch GDELT data: {e}")
-    try:
-        logger.error(f"Response Text: {r.text[:500]}")
-    except:
-        pass
-    exit(1)
+    timeline = r.json().get("timeline", [])
+    if not timeline:
+        return []
+    return [(p["date"], p["value"]) for p in timeline[0].get("data", [])]
 
-articles = data.get("articles", [])
-logger.info(f"Total articles fetched (raw): {len(articles)}")
 
-# Client-side filtering for Title
-filtered_articles = [
-    a for a in articles 
-    if a.get("title") and ("NVDA" in a["title"].upper() or "NVIDIA" in a["title"].upper())
-]
+def filter_by_title(articles: list, matcher: EntityMatcher = TITLE_MATCHER) -> list:
+    # Client-side filtering for Title: keeps articles naming an entity as a whole word
+    return route(articles, matcher)
 
-logger.info(f"Total articles after title filtering: {len(filtered_articles)}")
 
 # --- Cleaning & Deduplication ---
 
@@ -75,83 +84,257 @@ def normalize_url(url_str):
     # Enforce https
     if url_str.startswith("http://"):
         url_str = "https://" + url_str[7:]
-    
+
     parsed = urllib.parse.urlparse(url_str)
     # Remove query parameters (like utm_source)
     clean_url = f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
     return clean_url
 
-unique_urls = set()
-unique_title_domain = set()
-clean_articles = []
-
-for a in filtered_articles:
-    raw_url = a.get("url", "")
-    title = a.get("title", "").strip()
-    domain = a.get("domain", "").strip()
-    
-    clean_url = normalize_url(raw_url)
-    
-    # Deduplication checks
-    if clean_url in unique_urls:
-        continue
-    
-    # Check title+domain pair
-    td_key = (title, domain)
-    if td_key in unique_title_domain:
-        continue
-
-    unique_urls.add(clean_url)
-    unique_title_domain.add(td_key)
-    
-    # Update article with clean URL
-    a["url"] = clean_url
-    clean_articles.append(a)
-
-logger.info(f"Total articles after deduplication: {len(clean_articles)}")
+
+def deduplicate(articles: list) -> list:
+    unique_urls = set()
+    unique_title_domain = set()
+    clean_articles = []
+
+    for a in articles:
+        raw_url = a.get("url", "")
+        title = a.get("title", "").strip()
+        domain = a.get("domain", "").strip()
+
+        clean_url = normalize_url(raw_url)
+
+        # Deduplication checks
+        if clean_url in unique_urls:
+            continue
+
+        # Check title+domain pair
+        td_key = (title, domain)
+        if td_key in unique_title_domain:
+            continue
+
+        unique_urls.add(clean_url)
+        unique_title_domain.add(td_key)
+
+        # Update article with clean URL
+        a["url"] = clean_url
+        clean_articles.append(a)
+
+    return clean_articles
+
 
 # --- Statistics ---
 
-domains = [a.get("domain") for a in clean_articles if a.get("domain")]
-domain_counts = Counter(domains)
-top_5_domains = dict(domain_counts.most_common(5))
-unique_domain_count = len(domain_counts)
+def compute_stats(clean_articles: list) -> dict:
+    domains = [a.get("domain") for a in clean_articles if a.get("domain")]
+    domain_counts = Counter(domains)
+
+    # Daily counts based on 'seendate' (YYYYMMDDTHHMMSSZ), parsed in one vectorised pass
+    days = parse_seendates([a.get("seendate") for a in clean_articles]).dropna().dt.strftime("%Y-%m-%d")
+    daily_counts = Counter(days.tolist())
+
+    return {
+        "unique_domains": len(domain_counts),
+        "top_domains": dict(domain_counts.most_common(5)),
+        "daily_counts": dict(daily_counts),
+    }
+
+
+async def collect(runtime: HttpRuntime, stamp: str, start: str = None, end: str = None) -> str:
+    """
+    Fetches, filters, deduplicates and saves one snapshot. Returns the output path.
+    Without a window it is the latest MAX_RECORDS articles; a [start, end] window
+    (a backfill slice) is paged through completely.
+    """
+    if start and end:
+        articles = await fetch_window(runtime, QUERY, start, end)
+    else:
+        articles = await fetch_articles(runtime, build_url(start=start, end=end))
+    logger.info(f"Total articles fetched (raw): {len(articles)}")
+
+    filtered_articles = filter_by_title(articles)
+    logger.info(f"Total articles after title filtering: {len(filtered_articles)}")
+
+    clean_articles = deduplicate(filtered_articles)
+    logger.info(f"Total articles after deduplication: {len(clean_articles)}")
+
+    stats = compute_stats(clean_articles)
+
+    # Output Structure
+    output_data = {
+        "fetched_at_utc": stamp,
+        "query": QUERY,
+        "window_start": start,
+        "window_end": end,
+        "total_raw": len(articles),
+        "total_filtered": len(filtered_articles),
+        "total_unique": len(clean_articles),
+        **stats,
+        "articles": clean_articles
+    }
+
+    suffix = f"{start}_{end}" if start else stamp
+    out_file = os.path.join(DATA_DIR, f"gdelt_nvda_clean_{suffix}.json")
+
+    with open(out_file, "w", encoding="utf-8") as f:
+        json.dump(output_data, f, ensure_ascii=False, indent=2)
+
+    logger.info(f"Saved clean response to: {out_file}")
+    logger.info("Stats:")
+    logger.info(f" - Unique Domains: {stats['unique_domains']}")
+    logger.info(f" - Top Domains: {stats['top_domains']}")
+
+    catalog = Catalog()
+    catalog.record_run("gdelt", "articles", out_file, stamp)
+    catalog.close()
+
+    return out_file
 
-# Daily counts (last 7 days based on 'seendate')
-# seendate format in GDELT: YYYYMMDDTHHMMSSZ
-daily_counts = Counter()
-today = datetime.now(timezone.utc).date()
 
-for a in clean_articles:
-    sd = a.get("seendate")
-    if sd:
+def time_slices(hours: int, slice_hours: int, now: datetime = None) -> list:
+    """Splits the last `hours` into (start, end) GDELT datetime windows for backfills."""
+    end = (now or datetime.now(timezone.utc)).replace(minute=0, second=0, microsecond=0)
+    start = end - timedelta(hours=hours)
+    slices = []
+    while start < end:
+        stop = min(start + timedelta(hours=slice_hours), end)
+        slices.append((start.strftime("%Y%m%d%H%M%S"), stop.strftime("%Y%m%d%H%M%S")))
+        start = stop
+    return slices
+
+
+# --- Incremental polling ---
+
+def next_second(gdelt_datetime: str) -> str:
+    dt = datetime.strptime(gdelt_datetime, "%Y%m%d%H%M%S") + timedelta(seconds=1)
+    return dt.strftime("%Y%m%d%H%M%S")
+
+
+async def fetch_window(runtime: HttpRuntime, query: str, start: str, end: str) -> list:
+    """
+    All articles of one query in [start, end], oldest first, paging forward until a page comes back short.
+    GDELT stamps a whole 15-minute update batch with one seendate; when that second alone fills
+    a page, it is fetched again with the query's terms split in halves.
+    """
+    articles = []
+    while start < end:
+        page = await fetch_articles(runtime, build_url(query, start, end, max_records=PAGE_SIZE, sort="dateasc"))
+        articles += page
+        logger.info(f"Window {start}-{end}: {len(page)} raw")
+
+        if len(page) < PAGE_SIZE or not page[-1].get("seendate"):
+            break
+        last = seendate_to_gdelt(page[-1]["seendate"])
+        if last > start:
+            start = last
+            continue
+
+        # a full page inside one second would otherwise be requested forever
+        second = next_second(start)
+        halves = split_query(query)
+        if halves:
+            for half in halves:
+                articles += await fetch_window(runtime, half, start, second)
+        else:
+            logger.warning(f"More than {PAGE_SIZE} articles at {start} for {query!r} (window {start}-{end}); "
+                           f"only the first {PAGE_SIZE} are kept")
+        start = second
+    return articles
+
+
+async def poll(runtime: HttpRuntime, store: ArticleStore, queries: list = None,
+               matcher: EntityMatcher = TITLE_MATCHER) -> list:
+    """
+    Fetches only what was published since the store's high-water mark and
+    appends it. With several (batch) queries they run concurrently under the
+    GDELT rate limit, and titles are routed back to entities by `matcher`.
+    Returns the new articles.
+    """
+    start = store.start_datetime()
+    end = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+
+    if queries is None:
+        queries = [QUERY]
+        # tone/volume buckets of the polled window; the latest bucket is refreshed on the next poll.
+        # Timelines cannot be split by entity, so batch polls skip them.
+        for series in config.GDELT_TIMELINES:
+            points = await fetch_timeline(runtime, build_url(start=start, end=end, mode=series))
+            store.aggregates.add_timeline(points, ENTITY, series)
+
+    pages = await map_bounded(lambda q: fetch_window(runtime, q, start, end), queries,
+                              limit=config.GDELT_BATCH_CONCURRENCY)
+    articles = sorted((a for page in pages for a in page), key=lambda a: a.get("seendate") or "")
+
+    fresh = [a for a in deduplicate(filter_by_title(articles, matcher)) if store.is_new(a)]
+    store.append(fresh)
+    return fresh
+
+
+async def poll_forever(store: ArticleStore, interval: float, continuous: bool = True, watchlist: bool = False):
+    queries, matcher = None, TITLE_MATCHER
+    if watchlist:
+        terms = entity_terms()
+        queries, matcher = pack_queries(terms), build_matcher(terms)
+        logger.info(f"Watchlist: {len(terms)} entities packed into {len(queries)} queries")
+
+    async with HttpRuntime() as runtime:
+        while True:
+            try:
+                fresh = await poll(runtime, store, queries, matcher)
+                logger.info(f"Appended {len(fresh)} articles (high-water {store.state['high_water']})")
+                if watchlist:
+                    per_entity = Counter(e for a in fresh for e in a["entities"])
+                    logger.info(f" - Per entity: {dict(per_entity.most_common())}")
+                else:
+                    stats = store.aggregates.stats(ENTITY)
+                    logger.info(f" - Last {stats['window_days']} days: {stats['total_articles']} articles, top domains {stats['top_domains']}")
+            except Exception as e:
+                if not continuous:
+                    raise
+                logger.error(f"GDELT poll failed, retrying next interval: {e}")
+
+            if not continuous:
+                return
+            await asyncio.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GDELT news collector")
+    parser.add_argument("--incremental", action="store_true", help="Append articles newer than the stored high-water mark to the rolling store instead of writing a snapshot")
+    parser.add_argument("--continuous", action="store_true", help="Poll incrementally forever")
+    parser.add_argument("--watchlist", action="store_true", help="Poll every EDGAR watchlist ticker (and its aliases) with packed OR-queries; implies --incremental")
+    parser.add_argument("--interval", type=float, default=config.GDELT_POLL_INTERVAL, help="Seconds between polls in continuous mode")
+    args = parser.parse_args()
+
+    if args.incremental or args.continuous or args.watchlist:
+        if args.watchlist:
+            # own high-water mark: the single-query poll must not move the watchlist's start forward
+            store = ArticleStore(config.GDELT_WATCHLIST_STORE_DIR, Aggregates(config.GDELT_WATCHLIST_AGGREGATES_DB))
+        else:
+            store = ArticleStore()
         try:
-            # Parse '20250209T140000Z'
-            dt = datetime.strptime(sd, "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
-            date_str = str(dt.date())
-            daily_counts[date_str] += 1
-        except ValueError:
-            pass
-
-# Output Structure
-output_data = {
-    "fetched_at_utc": START_DATETIME,
-    "query": QUERY_STRING,
-    "total_raw": len(articles),
-    "total_filtered": len(filtered_articles),
-    "total_unique": len(clean_articles),
-    "unique_domains": unique_domain_count,
-    "top_domains": top_5_domains,
-    "daily_counts": dict(daily_counts),
-    "articles": clean_articles
-}
-
-out_file = os.path.join(DATA_DIR, f"gdelt_nvda_clean_{START_DATETIME}.json")
-
-with open(out_file, "w", encoding="utf-8") as f:
-    json.dump(output_data, f, ensure_ascii=False, indent=2)
-
-logger.info(f"Saved clean response to: {out_file}")
-logger.info("Stats:")
-logger.info(f" - Unique Domains: {unique_domain_count}")
-logger.info(f" - Top Domains: {top_5_domains}")
\ No newline at end of file
+            run(poll_forever(store, args.interval, args.continuous, args.watchlist))
+        except KeyboardInterrupt:
+            logger.info("Stopped.")
+        except Exception as e:
+            logger.error(f"Failed to fetch GDELT data: {e}")
+            sys.exit(1)
+        finally:
+            store.close()
+        return
+
+    stamp = datetime.now(timezone.utc).replace(microsecond=0).strftime("%Y%m%d%H%M%S")
+
+    async def collect_latest():
+        async with HttpRuntime() as runtime:
+            return await collect(runtime, stamp)
+
+    try:
+        run(collect_latest())
+    except Exception as e:
+        # HttpError carries the first 500 chars of the response body
+        logger.error(f"Failed to fetch GDELT data: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+import os
+import json
+import sqlite3
+import argparse
+from typing import Optional
+from datetime import datetime, timedelta, timezone
+import pandas as pd
+import config
+
+DB_PATH = config.GDELT_AGGREGATES_DB
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily_counts (
+    day   TEXT NOT NULL,
+    query TEXT NOT NULL,
+    n     INTEGER NOT NULL,
+    PRIMARY KEY (query, day)
+);
+
+CREATE TABLE IF NOT EXISTS domain_counts (
+    day    TEXT NOT NULL,
+    query  TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    n      INTEGER NOT NULL,
+    PRIMARY KEY (query, day, domain)
+);
+
+CREATE TABLE IF NOT EXISTS timelines (
+    ts     TEXT NOT NULL,
+    query  TEXT NOT NULL,
+    series TEXT NOT NULL,
+    value  REAL NOT NULL,
+    PRIMARY KEY (query, series, ts)
+);
+
+-- ArticleStore bookkeeping (high-water mark, committed JSONL sizes), committed with the counters
+CREATE TABLE IF NOT EXISTS store_state (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def parse_seendates(values) -> pd.Series:
+    """Vectorised '20250209T140000Z' -> UTC timestamps (NaT when malformed)."""
+    return pd.to_datetime(pd.Series(values, dtype="object"), format="%Y%m%dT%H%M%SZ", errors="coerce", utc=True)
+
+
+def days_ago(days: int) -> str:
+    return (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d")
+
+
+class Aggregates:
+    """
+    Rolling GDELT counters (SQLite): articles per day and per day/domain for each
+    query, plus GDELT timeline series (tone, raw volume). Ingest adds only the
+    new rows' counts, and range queries read the small counter tables, so
+    long-horizon features never rescan the stored articles.
+    """
+
+    def __init__(self, db_path: str = DB_PATH):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def _transaction(self, fn):
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn()
+            self.conn.execute("COMMIT")
+            return result
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def _write_many(self, sql: str, rows: list):
+        self._transaction(lambda: self.conn.executemany(sql, rows))
+
+    # --- Ingest ---
+
+    def _add_counts(self, articles: list, query: str) -> int:
+        df = pd.DataFrame({
+            "seendate": [a.get("seendate") for a in articles],
+            "domain": [a.get("domain") or None for a in articles],
+        })
+        df["day"] = parse_seendates(df["seendate"]).dt.strftime("%Y-%m-%d")
+        df = df.dropna(subset=["day"])
+
+        daily = df.groupby("day").size()
+        domains = df.dropna(subset=["domain"]).groupby(["day", "domain"]).size()
+
+        self.conn.executemany(
+            "INSERT INTO daily_counts VALUES (?, ?, ?) ON CONFLICT (query, day) DO UPDATE SET n = n + excluded.n",
+            [(day, query, int(n)) for day, n in daily.items()]
+        )
+        self.conn.executemany(
+            "INSERT INTO domain_counts VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (query, day, domain) DO UPDATE SET n = n + excluded.n",
+            [(day, query, domain, int(n)) for (day, domain), n in domains.items()]
+        )
+        return len(df)
+
+    def add_articles(self, articles: list, query: str) -> int:
+        """Adds the counts of newly stored articles (each article must be ingested once)."""
+        if not articles:
+            return 0
+        return self._transaction(lambda: self._add_counts(articles, query))
+
+    def ingest(self, by_query: dict, state: dict):
+        """
+        Adds the counts of {query: articles} and saves the store state in one
+        transaction, so counters and high-water mark can never disagree.
+        """
+        def write():
+            for query, articles in by_query.items():
+                self._add_counts(articles, query)
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO store_state VALUES (?, ?)",
+                [(key, json.dumps(value)) for key, value in state.items()]
+            )
+        self._transaction(write)
+
+    def load_state(self) -> dict:
+        return {key: json.loads(value) for key, value in self.conn.execute("SELECT key, value FROM store_state")}
+
+    def add_timeline(self, points: list, query: str, series: str) -> int:
+        """Stores (ts, value) points of a GDELT timeline; re-fetched buckets overwrite the old value."""
+        self._write_many(
+            "INSERT OR REPLACE INTO timelines VALUES (?, ?, ?, ?)",
+            [(ts, query, series, float(value)) for ts, value in points]
+        )
+        return len(points)
+
+    # --- Range queries ---
+
+    def daily_volume(self, query: str, start: str = None, end: str = None) -> pd.Series:
+        """Articles per day in [start, end] (YYYY-MM-DD), with empty days filled with 0."""
+        start = start or days_ago(90)
+        end = end or datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        rows = self.conn.execute(
+            "SELECT day, n FROM daily_counts WHERE query = ? AND day BETWEEN ? AND ? ORDER BY day",
+            (query, start, end)
+        ).fetchall()
+
+        series = pd.Series({day: n for day, n in rows}, dtype="int64")
+        series.index = pd.to_datetime(series.index)
+        return series.reindex(pd.date_range(start, end, freq="D"), fill_value=0)
+
+    def first_day(self, query: str) -> Optional[str]:
+        """First day with ingested articles; earlier days were never collected, not quiet."""
+        return self.conn.execute("SELECT MIN(day) FROM daily_counts WHERE query = ?", (query,)).fetchone()[0]
+
+    def domain_share(self, query: str, days: int = 90, top: Optional[int] = 10) -> pd.DataFrame:
+        """Top domains over the last `days` with their share of all articles in that window."""
+        rows = self.conn.execute(
+            "SELECT domain, SUM(n) AS n FROM domain_counts WHERE query = ? AND day >= ? "
+            "GROUP BY domain ORDER BY n DESC",
+            (query, days_ago(days))
+        ).fetchall()
+
+        df = pd.DataFrame(rows, columns=["domain", "articles"])
+        if df.empty:
+            return df.assign(share=pd.Series(dtype="float64"))
+        df["share"] = (df["articles"] / df["articles"].sum()).round(4)
+        return df if top is None else df.head(top)
+
+    def volume_spikes(self, query: str, days: int = 90, window: int = 7, threshold: float = 2.0) -> pd.DataFrame:
+        """
+        Days whose article count exceeds the trailing `window`-day mean by
+        `threshold` standard deviations (z-score against the days before it).
+        The series starts at the first ingested day, and the deviation is floored
+        at the Poisson sqrt(mean) (and 1), so a flat or empty baseline still
+        scores a burst instead of dividing by zero.
+        """
+        first = self.first_day(query)
+        if first is None:
+            return pd.DataFrame(columns=["day", "articles", "baseline", "zscore"])
+
+        volume = self.daily_volume(query, max(days_ago(days + window), first))
+        history = volume.shift(1).rolling(window, min_periods=window)
+        mean, std = history.mean(), history.std()
+        floor = (mean ** 0.5).clip(lower=1)
+
+        df = pd.DataFrame({"articles": volume, "baseline": mean.round(2)})
+        df["zscore"] = ((volume - mean) / std.where(std > floor, floor)).round(2)
+        df = df[df.index >= pd.Timestamp(days_ago(days))]
+        return df[df["zscore"] >= threshold].rename_axis("day").reset_index()
+
+    def timeline(self, query: str, series: str, start: str = None) -> pd.Series:
+        """A stored GDELT timeline (e.g. "TimelineTone") from `start` (GDELT YYYYMMDDTHHMMSSZ form)."""
+        rows = self.conn.execute(
+            "SELECT ts, value FROM timelines WHERE query = ? AND series = ? AND ts >= ? ORDER BY ts",
+            (query, series, start or "")
+        ).fetchall()
+        return pd.Series([v for _, v in rows], index=parse_seendates([ts for ts, _ in rows]), dtype="float64")
+
+    def stats(self, query: str, days: int = 90, top: int = 5) -> dict:
+        volume = self.daily_volume(query, days_ago(days))
+        domains = self.domain_share(query, days, top=None)
+        return {
+            "window_days": days,
+            "total_articles": int(volume.sum()),
+            "unique_domains": len(domains),
+            "top_domains": dict(zip(domains["domain"].head(top), domains["articles"].head(top).astype(int))),
+            "daily_counts": {str(day.date()): int(n) for day, n in volume.items() if n},
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Range queries over the rolling GDELT aggregates")
+    parser.add_argument("--query", type=str, default=config.EDGAR_TICKER, help="Entity the counts were ingested under")
+    parser.add_argument("--days", type=int, default=90, help="Window length in days")
+    parser.add_argument("--watchlist", action="store_true", help="Read the aggregates of the batch (gdelt.py --watchlist) poll")
+    args = parser.parse_args()
+
+    aggregates = Aggregates(config.GDELT_WATCHLIST_AGGREGATES_DB if args.watchlist else DB_PATH)
+    stats = aggregates.stats(args.query, args.days)
+    print(f"{args.query}: {stats['total_articles']} articles from {stats['unique_domains']} domains in the last {args.days} days\n")
+
+    print("Domain share:")
+    print(aggregates.domain_share(args.query, args.days).to_string(index=False))
+
+    print("\nVolume spikes:")
+    spikes = aggregates.volume_spikes(args.query, args.days)
+    print(spikes.to_string(index=False) if not spikes.empty else "none")
+
+    tone = aggregates.timeline(args.query, "TimelineTone")
+    if not tone.empty:
+        print(f"\nAverage tone (last {args.days} days): {tone[tone.index >= pd.Timestamp(days_ago(args.days), tz='UTC')].mean():.2f}")
+
+    aggregates.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import logging
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+import config
+
+logger = logging.getLogger(__name__)
+
+# GDELT rejects keywords shorter than this
+MIN_KEYWORD_LENGTH = 3
+
+
+def entity_terms(tickers: Iterable[str] = None, aliases: Dict[str, List[str]] = None) -> Dict[str, List[str]]:
+    """Ticker -> search terms (the ticker itself plus its aliases), for the EDGAR watchlist by default."""
+    tickers = tickers if tickers is not None else config.EDGAR_WATCHLIST.keys()
+    aliases = aliases if aliases is not None else config.GDELT_ALIASES
+    terms = {}
+    for ticker in tickers:
+        names = [ticker] + [a for a in aliases.get(ticker, []) if a.upper() != ticker.upper()]
+        terms[ticker] = list(dict.fromkeys(names))
+    return terms
+
+
+def searchable(names: List[str]) -> List[str]:
+    return [n for n in names if len(n) >= MIN_KEYWORD_LENGTH]
+
+
+def query_terms(ticker: str, names: List[str]) -> List[str]:
+    """
+    GDELT keyword search ignores case, so a bare ticker like ALL or NOW would pull
+    in every article using the word; it is only sent when the entity has no alias.
+    """
+    names = searchable(names)
+    aliases = [n for n in names if n != ticker]
+    return aliases or names
+
+
+def query_term(term: str) -> str:
+    return f'"{term}"' if " " in term else term
+
+
+def build_query(terms: List[str], suffix: str = config.GDELT_QUERY_SUFFIX) -> str:
+    # GDELT only allows parentheses around OR'd terms
+    body = " OR ".join(query_term(t) for t in terms)
+    if len(terms) > 1:
+        body = f"({body})"
+    return f"{body} {suffix}".strip()
+
+
+def split_query(query: str) -> Optional[List[str]]:
+    """
+    Splits a build_query OR-query into two queries with half the terms each (same
+    suffix), for windows that hold more articles than one page; None for a single term.
+    """
+    if not query.startswith("("):
+        return None
+    close = query.index(")")
+    terms = [t.strip('"') for t in query[1:close].split(" OR ")]
+    suffix = query[close + 1:].strip()
+    half = len(terms) // 2
+    return [build_query(terms[:half], suffix), build_query(terms[half:], suffix)]
+
+
+def pack_queries(terms: Dict[str, List[str]], max_length: int = config.GDELT_MAX_QUERY_LENGTH,
+                 suffix: str = config.GDELT_QUERY_SUFFIX) -> List[str]:
+    """
+    Greedily packs every entity's terms into as few OR-queries as fit within
+    max_length characters. An entity's terms always stay in one query.
+    """
+    queries, batch = [], []
+    for ticker, names in terms.items():
+        names = query_terms(ticker, names)
+        if not names:
+            logger.warning(f"No search term of {MIN_KEYWORD_LENGTH}+ characters for {ticker}; add an alias")
+            continue
+
+        if batch and len(build_query(batch + names, suffix)) > max_length:
+            queries.append(build_query(batch, suffix))
+            batch = []
+        if not batch and len(build_query(names, suffix)) > max_length:
+            logger.warning(f"Terms of {ticker} alone exceed {max_length} characters")
+        batch += names
+
+    if batch:
+        queries.append(build_query(batch, suffix))
+    return queries
+
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher: finds which of many terms occur in a text in one pass
+    over it, regardless of the number of terms. Only whole words count ("ARM"
+    does not match "ALARM"); matching ignores case unless case_sensitive is set.
+    """
+
+    def __init__(self, patterns: Dict[str, str], case_sensitive: bool = False):
+        # pattern -> label; node 0 is the root
+        self.case_sensitive = case_sensitive
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+
+        for pattern, label in patterns.items():
+            if not case_sensitive:
+                pattern = pattern.lower()
+            node = 0
+            for ch in pattern:
+                if ch not in self.goto[node]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                    self.goto[node][ch] = len(self.goto) - 1
+                node = self.goto[node][ch]
+            self.out[node].append((len(pattern), label))
+
+        # breadth-first: a node's failure link is the longest proper suffix that is also a prefix
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self.goto[node].items():
+                queue.append(child)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[child] = self.goto[f].get(ch, 0)
+                self.out[child] = self.out[child] + self.out[self.fail[child]]
+
+    def find(self, text: str) -> set:
+        if not self.case_sensitive:
+            text = text.lower()
+        labels = set()
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(ch, 0)
+            for length, label in self.out[node]:
+                start, end = i - length + 1, i + 1
+                if (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum()):
+                    labels.add(label)
+        return labels
+
+
+class EntityMatcher:
+    """
+    Routes titles to tickers. Bare tickers only match in upper case ("ALL", not
+    "All you need to know"), cashtags ("$nvda") and company aliases in any case.
+    """
+
+    def __init__(self, terms: Dict[str, List[str]]):
+        tickers, aliases = {}, {}
+        for ticker, names in terms.items():
+            # same keyword floor as the queries, so nothing is matched that was never searched for
+            for name in searchable(names):
+                if name == ticker:
+                    tickers[ticker.upper()] = ticker
+                    aliases["$" + ticker] = ticker
+                else:
+                    aliases[name] = ticker
+        self.tickers = AhoCorasick(tickers, case_sensitive=True)
+        self.aliases = AhoCorasick(aliases)
+
+    def find(self, text: str) -> set:
+        return self.tickers.find(text) | self.aliases.find(text)
+
+
+def build_matcher(terms: Dict[str, List[str]]) -> EntityMatcher:
+    return EntityMatcher(terms)
+
+
+def route(articles: list, matcher: EntityMatcher) -> list:
+    """Tags each article with the entities its title mentions; articles that mention none are dropped."""
+    routed = []
+    for a in articles:
+        entities = matcher.find(a.get("title") or "")
+        if entities:
+            a["entities"] = sorted(entities)
+            routed.append(a)
+    return routed
@@ -0,0 +1,135 @@
+import os
+import json
+from datetime import datetime, timedelta, timezone
+import config
+from gdelt_aggregates import Aggregates
+
+STORE_DIR = config.GDELT_STORE_DIR
+
+
+def seendate_to_gdelt(seendate: str) -> str:
+    """'20250209T140000Z' -> '20250209140000' (the startdatetime/enddatetime format)."""
+    return seendate.replace("T", "").replace("Z", "")
+
+
+def article_key(article: dict) -> str:
+    return article.get("url", "")
+
+
+class ArticleStore:
+    """
+    Rolling GDELT article store: new articles are appended to date-partitioned
+    JSONL files (articles/YYYY-MM-DD.jsonl, by seendate) and their counts go to
+    the rolling aggregates, so each poll only touches what it adds. Lives under
+    STATE_DIR, so pipeline cleanups keep it.
+
+    The high-water mark and the committed size of every JSONL file are saved in
+    the aggregates database, in the same transaction as the counters. Bytes past
+    a file's committed size come from an append that never committed (crash,
+    "database is locked"); they are cut off before the next append, so a replayed
+    poll neither duplicates lines nor counts an article twice.
+    """
+
+    def __init__(self, root: str = STORE_DIR, aggregates: Aggregates = None):
+        self.root = root
+        self.aggregates = aggregates or Aggregates()
+        self.articles_dir = os.path.join(root, "articles")
+        self.state_path = os.path.join(root, "state.json")
+        os.makedirs(self.articles_dir, exist_ok=True)
+        self.state = self._load_state()
+        self._discard_uncommitted()
+
+    def close(self):
+        self.aggregates.close()
+
+    def _load_state(self) -> dict:
+        state = {"high_water": None, "boundary_keys": [], "partitions": {}}
+        saved = self.aggregates.load_state()
+        if saved:
+            state.update(saved)
+        elif os.path.exists(self.state_path):
+            # stores written before the state moved into the aggregates database
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state.update(json.load(f))
+            state["partitions"] = {
+                name[:-len(".jsonl")]: os.path.getsize(os.path.join(self.articles_dir, name))
+                for name in os.listdir(self.articles_dir) if name.endswith(".jsonl")
+            }
+            self.aggregates.ingest({}, state)
+        return state
+
+    def partition_path(self, day: str) -> str:
+        return os.path.join(self.articles_dir, f"{day}.jsonl")
+
+    def _truncate(self, day: str):
+        """Cuts a partition back to its committed size (0, i.e. removed, if it was never committed)."""
+        path = self.partition_path(day)
+        committed = self.state["partitions"].get(day, 0)
+        if not os.path.exists(path) or os.path.getsize(path) <= committed:
+            return
+        if committed:
+            os.truncate(path, committed)
+        else:
+            os.remove(path)
+
+    def _discard_uncommitted(self):
+        for name in os.listdir(self.articles_dir):
+            if name.endswith(".jsonl"):
+                self._truncate(name[:-len(".jsonl")])
+
+    def start_datetime(self, lookback_hours: int = config.GDELT_INITIAL_LOOKBACK_HOURS) -> str:
+        """Where the next poll starts: the last seendate stored, or the initial lookback window."""
+        if self.state["high_water"]:
+            return seendate_to_gdelt(self.state["high_water"])
+        start = datetime.now(timezone.utc) - timedelta(hours=lookback_hours)
+        return start.strftime("%Y%m%d%H%M%S")
+
+    def is_new(self, article: dict) -> bool:
+        """
+        startdatetime is inclusive, so articles seen at exactly the high-water
+        mark come back on the next poll; those are recognised by URL.
+        """
+        sd = article.get("seendate")
+        high_water = self.state["high_water"]
+        if not sd or not high_water or sd > high_water:
+            return True
+        return sd == high_water and article_key(article) not in self.state["boundary_keys"]
+
+    def append(self, articles: list) -> int:
+        """
+        Appends articles (sorted by seendate) and, in one aggregates transaction,
+        counts them for every entity in each article's "entities" list and moves
+        the high-water mark.
+        """
+        by_day = {}
+        for a in articles:
+            sd = a.get("seendate")
+            day = f"{sd[:4]}-{sd[4:6]}-{sd[6:8]}" if sd else "unknown"
+            by_day.setdefault(day, []).append(a)
+
+        state = {**self.state, "partitions": dict(self.state["partitions"])}
+        for day, rows in by_day.items():
+            self._truncate(day)
+            path = self.partition_path(day)
+            with open(path, "a", encoding="utf-8") as f:
+                for a in rows:
+                    f.write(json.dumps(a, ensure_ascii=False) + "\n")
+            state["partitions"][day] = os.path.getsize(path)
+
+        by_entity = {}
+        for a in articles:
+            for entity in a.get("entities", []):
+                by_entity.setdefault(entity, []).append(a)
+
+        dated = [a for a in articles if a.get("seendate")]
+        if dated:
+            newest = max(a["seendate"] for a in dated)
+            keys = [article_key(a) for a in dated if a["seendate"] == newest]
+            if newest == state["high_water"]:
+                keys += state["boundary_keys"]
+            state["high_water"] = newest
+            state["boundary_keys"] = keys
+
+        self.aggregates.ingest(by_entity, state)
+        self.state = state
+        return len(articles)
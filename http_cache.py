@@ -0,0 +1,185 @@
+import os
+import gzip
+import json
+import time
+import shutil
+import sqlite3
+import hashlib
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+import config
+
+CACHE_DIR = config.HTTP_CACHE_DIR
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key           TEXT PRIMARY KEY,
+    url           TEXT NOT NULL,
+    status        INTEGER NOT NULL,
+    headers       TEXT NOT NULL,
+    etag          TEXT,
+    last_modified TEXT,
+    immutable     INTEGER NOT NULL DEFAULT 0,
+    size          INTEGER NOT NULL,
+    stored_at     REAL NOT NULL,
+    accessed_at   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed_at);
+"""
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    status: int
+    headers: Dict[str, str]
+    etag: Optional[str]
+    last_modified: Optional[str]
+    immutable: bool
+    stored_at: float
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def is_immutable(url: str) -> bool:
+    """EDGAR archive documents never change once filed."""
+    path = urlsplit(url).path
+    return any(path.startswith(prefix) for prefix in config.HTTP_CACHE_IMMUTABLE_PATHS)
+
+
+class DiskCache:
+    """
+    Persistent HTTP response cache: gzip-compressed bodies on disk, metadata in SQLite.
+    Entries are keyed by a hash of URL + params (so API keys never hit the index)
+    and evicted least-recently-used once the total size exceeds max_bytes.
+    """
+
+    def __init__(self, root: str = CACHE_DIR, max_bytes: int = config.HTTP_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+        # Blob compression runs in worker threads, so the connection is shared under a lock
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(root, "cache.db"), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def _hash(self, key: str) -> str:
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest + ".gz")
+
+    def lookup(self, key: str) -> Optional[CacheEntry]:
+        digest = self._hash(key)
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT url, status, headers, etag, last_modified, immutable, stored_at FROM entries WHERE key = ?",
+                (digest,)
+            ).fetchone()
+
+        if row is None or not os.path.exists(self._blob_path(digest)):
+            return None
+
+        url, status, headers, etag, last_modified, immutable, stored_at = row
+        return CacheEntry(url, status, json.loads(headers), etag, last_modified, bool(immutable), stored_at)
+
+    def read(self, key: str) -> bytes:
+        digest = self._hash(key)
+        self._mark_accessed(digest)
+        with gzip.open(self._blob_path(digest), "rb") as f:
+            return f.read()
+
+    def read_to(self, key: str, out_path: str):
+        """Streams a cached body into out_path without loading it into memory."""
+        digest = self._hash(key)
+        self._mark_accessed(digest)
+        with gzip.open(self._blob_path(digest), "rb") as src, open(out_path, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+
+    def touch(self, key: str):
+        """Revalidated (304): the stored body is current again."""
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE entries SET stored_at = ?, accessed_at = ? WHERE key = ?",
+                (now, now, self._hash(key))
+            )
+
+    def store(self, key: str, url: str, status: int, headers: Dict[str, str], body: bytes):
+        digest = self._hash(key)
+        path = self._blob_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with gzip.open(path + ".part", "wb") as f:
+            f.write(body)
+        os.replace(path + ".part", path)
+
+        self._index(digest, url, status, headers, os.path.getsize(path))
+
+    def store_file(self, key: str, url: str, status: int, headers: Dict[str, str], src_path: str):
+        digest = self._hash(key)
+        path = self._blob_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with open(src_path, "rb") as src, gzip.open(path + ".part", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(path + ".part", path)
+
+        self._index(digest, url, status, headers, os.path.getsize(path))
+
+    def _mark_accessed(self, digest: str):
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), digest))
+
+    def _index(self, digest: str, url: str, status: int, headers: Dict[str, str], size: int):
+        now = time.time()
+        lowered = {k.lower(): v for k, v in headers.items()}
+
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    digest, url, status, json.dumps(headers),
+                    lowered.get("etag"), lowered.get("last-modified"),
+                    int(is_immutable(url)), size, now, now
+                )
+            )
+
+        self.evict()
+
+    def evict(self):
+        """Drops least-recently-used entries until the cache is back under max_bytes."""
+        with self.lock:
+            total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+
+            victims = []
+            for digest, size in self.conn.execute("SELECT key, size FROM entries ORDER BY accessed_at"):
+                if total <= self.max_bytes:
+                    break
+                victims.append(digest)
+                total -= size
+
+            with self.conn:
+                self.conn.executemany("DELETE FROM entries WHERE key = ?", [(d,) for d in victims])
+
+        for digest in victims:
+            try:
+                os.remove(self._blob_path(digest))
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,319 @@
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+from urllib.parse import urlsplit, urlencode
+import aiohttp
+import config
+from http_cache import DiskCache, is_immutable
+
+logger = logging.getLogger(__name__)
+
+SEC_HEADERS = {
+    "User-Agent": config.USER_AGENT,
+    "Accept-Encoding": "gzip, deflate",
+}
+
+
+@dataclass
+class HostPolicy:
+    rate: float = 5.0                 # requests per second
+    burst: int = 1
+    max_connections: int = 4          # size of the host's connection pool
+    retries: int = 3
+    backoff: float = 1.0              # base seconds for exponential backoff
+    retry_statuses: tuple = (429, 500, 502, 503, 504)
+    timeout: float = 30.0             # seconds to connect / between reads (stall timeout)
+    deadline: float = 300.0           # seconds for a whole attempt, body included (slow-drip timeout)
+    headers: Dict[str, str] = field(default_factory=dict)
+    cache: bool = True                # keep responses in the on-disk cache
+    cache_ttl: float = 0              # seconds a cached response is served without revalidation
+    limiter: Optional[str] = None     # hosts sharing a limiter name share one rate limit
+
+
+# SEC allows 10 requests/second across all of its hosts, so www and data share a limiter
+HOST_POLICIES = {
+    # full-index master.gz files run to tens of MB, so www gets a longer deadline
+    "www.sec.gov": HostPolicy(rate=config.SEC_REQUESTS_PER_SECOND, max_connections=4, deadline=900.0, headers=SEC_HEADERS, limiter="sec"),
+    "data.sec.gov": HostPolicy(rate=config.SEC_REQUESTS_PER_SECOND, max_connections=2, headers=SEC_HEADERS, limiter="sec"),
+    "api.stlouisfed.org": HostPolicy(rate=config.FRED_REQUESTS_PER_SECOND, max_connections=4, cache_ttl=3600),
+    "api.gdeltproject.org": HostPolicy(rate=config.GDELT_REQUESTS_PER_SECOND, max_connections=2, retries=5, backoff=2.0, timeout=20.0, deadline=60.0, cache=False),
+}
+
+DEFAULT_POLICY = HostPolicy()
+
+
+class HttpError(Exception):
+    def __init__(self, url: str, status: Optional[int] = None, message: str = ""):
+        self.url = url
+        self.status = status
+        super().__init__(f"{status or 'request failed'} for {url}: {message}".strip())
+
+
+@dataclass
+class HttpResponse:
+    url: str
+    status: int
+    headers: Dict[str, str]
+    body: bytes = b""
+    from_cache: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+    def text(self, encoding: str = "utf-8") -> str:
+        return self.body.decode(encoding, errors="ignore")
+
+    def json(self):
+        return json.loads(self.body)
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise HttpError(self.url, self.status, self.text()[:500])
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def cache_key(url: str, params: Optional[dict] = None) -> str:
+    if params:
+        return url + "?" + urlencode(sorted(params.items()))
+    return url
+
+
+class HttpRuntime:
+    """
+    Shared async HTTP runtime for the collectors: one connection pool, rate limit
+    and retry policy per host, on top of the persistent response cache.
+    Use as `async with HttpRuntime() as rt: ...` inside a single event loop.
+    """
+
+    def __init__(self, policies: Dict[str, HostPolicy] = None, cache: DiskCache = None, use_cache: bool = True,
+                 limiters: dict = None):
+        self.policies = policies if policies is not None else HOST_POLICIES
+        self.cache = (cache or DiskCache()) if use_cache else None
+        self.sessions: Dict[str, aiohttp.ClientSession] = {}
+        # limiter name (policy.limiter or host) -> object with `async acquire()`;
+        # pass shared ones to enforce a rate limit across processes
+        self.limiters = dict(limiters or {})
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        for session in self.sessions.values():
+            await session.close()
+        self.sessions.clear()
+        if self.cache is not None:
+            self.cache.close()
+
+    def policy_for(self, host: str) -> HostPolicy:
+        return self.policies.get(host, DEFAULT_POLICY)
+
+    def session_for(self, host: str, policy: HostPolicy) -> aiohttp.ClientSession:
+        session = self.sessions.get(host)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(limit=policy.max_connections)
+            session = aiohttp.ClientSession(connector=connector, headers=policy.headers)
+            self.sessions[host] = session
+        return session
+
+    def limiter_for(self, host: str, policy: HostPolicy) -> TokenBucket:
+        name = policy.limiter or host
+        limiter = self.limiters.get(name)
+        if limiter is None:
+            limiter = TokenBucket(policy.rate, policy.burst)
+            self.limiters[name] = limiter
+        return limiter
+
+    async def _attempts(self, url: str, params: Optional[dict], headers: Optional[dict], handle):
+        """
+        Runs `handle(resp)` under the host's rate limit with retries.
+        Retryable statuses and network errors back off exponentially (Retry-After wins).
+        """
+        host = urlsplit(url).hostname or ""
+        policy = self.policy_for(host)
+        session = self.session_for(host, policy)
+        limiter = self.limiter_for(host, policy)
+        timeout = aiohttp.ClientTimeout(total=policy.deadline, sock_connect=policy.timeout, sock_read=policy.timeout)
+
+        for attempt in range(policy.retries + 1):
+            delay = policy.backoff * (2 ** attempt) + random.uniform(0, policy.backoff)
+            await limiter.acquire()
+
+            try:
+                async with session.get(url, params=params, headers=headers, timeout=timeout) as resp:
+                    if resp.status in policy.retry_statuses and attempt < policy.retries:
+                        retry_after = resp.headers.get("Retry-After", "")
+                        if retry_after.isdigit():
+                            delay = float(retry_after)
+                        logger.warning(f"{resp.status} from {host}, retrying in {delay:.1f}s")
+                    else:
+                        return await handle(resp)
+
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt >= policy.retries:
+                    raise HttpError(url, None, repr(e)) from e
+                logger.warning(f"{e!r} from {host}, retrying in {delay:.1f}s")
+
+            await asyncio.sleep(delay)
+
+    def cached_entry(self, key: str, policy: HostPolicy):
+        if self.cache is None or not policy.cache:
+            return None
+        return self.cache.lookup(key)
+
+    @staticmethod
+    def is_fresh(entry, policy: HostPolicy) -> bool:
+        return entry.immutable or (policy.cache_ttl > 0 and time.time() - entry.stored_at < policy.cache_ttl)
+
+    @staticmethod
+    def is_cacheable(response: HttpResponse, policy: HostPolicy) -> bool:
+        # Without validators, a TTL or immutability a cached body could never be reused
+        headers = {k.lower() for k in response.headers}
+        return response.ok and (
+            is_immutable(response.url) or policy.cache_ttl > 0
+            or "etag" in headers or "last-modified" in headers
+        )
+
+    async def get(self, url: str, params: Optional[dict] = None, headers: Optional[dict] = None) -> HttpResponse:
+        """
+        Cached GET. Fresh or immutable entries are served without touching the network
+        (or the rate limiter); stale ones are revalidated with a conditional GET.
+        """
+        policy = self.policy_for(urlsplit(url).hostname or "")
+        key = cache_key(url, params)
+        entry = self.cached_entry(key, policy)
+
+        if entry is not None and self.is_fresh(entry, policy):
+            return HttpResponse(entry.url, entry.status, entry.headers, self.cache.read(key), from_cache=True)
+
+        request_headers = dict(headers or {})
+        if entry is not None:
+            request_headers.update(entry.conditional_headers())
+
+        async def handle(resp):
+            body = await resp.read()
+            return HttpResponse(str(resp.url), resp.status, dict(resp.headers), body)
+
+        response = await self._attempts(url, params, request_headers, handle)
+
+        if response.status == 304 and entry is not None:
+            self.cache.touch(key)
+            return HttpResponse(entry.url, entry.status, entry.headers, self.cache.read(key), from_cache=True)
+
+        if self.cache is not None and policy.cache and self.is_cacheable(response, policy):
+            self.cache.store(key, url, response.status, response.headers, response.body)
+
+        return response
+
+    async def download(self, url: str, out_path: str, params: Optional[dict] = None,
+                       headers: Optional[dict] = None, chunk_size: int = 1 << 16,
+                       cache: bool = True) -> HttpResponse:
+        """
+        Streams the body to out_path in chunks (bounded memory). Only successful
+        responses are written, via out_path + ".part", which is removed if the
+        stream fails; the returned response carries no body.
+        Goes through the same cache rules as get(); cache file I/O runs in a worker thread.
+        cache=False bypasses the cache for files that are read once (e.g. EDGAR index files).
+        """
+        policy = self.policy_for(urlsplit(url).hostname or "")
+        key = cache_key(url, params)
+        entry = self.cached_entry(key, policy) if cache else None
+
+        if entry is not None and self.is_fresh(entry, policy):
+            await asyncio.to_thread(self.cache.read_to, key, out_path)
+            return HttpResponse(entry.url, entry.status, entry.headers, from_cache=True)
+
+        request_headers = dict(headers or {})
+        if entry is not None:
+            request_headers.update(entry.conditional_headers())
+
+        async def handle(resp):
+            response = HttpResponse(str(resp.url), resp.status, dict(resp.headers))
+            if not response.ok:
+                return response
+
+            part_path = out_path + ".part"
+            try:
+                with open(part_path, "wb") as f:
+                    async for chunk in resp.content.iter_chunked(chunk_size):
+                        f.write(chunk)
+            except BaseException:
+                # a broken or cancelled stream must not leave a partial (possibly tens of MB) file behind
+                if os.path.exists(part_path):
+                    os.remove(part_path)
+                raise
+            os.replace(part_path, out_path)
+            return response
+
+        response = await self._attempts(url, params, request_headers, handle)
+
+        if response.status == 304 and entry is not None:
+            self.cache.touch(key)
+            await asyncio.to_thread(self.cache.read_to, key, out_path)
+            return HttpResponse(entry.url, entry.status, entry.headers, from_cache=True)
+
+        if cache and self.cache is not None and policy.cache and self.is_cacheable(response, policy):
+            await asyncio.to_thread(self.cache.store_file, key, url, response.status, response.headers, out_path)
+
+        return response
+
+
+async def map_bounded(func, items, limit: int = config.HTTP_MAX_CONCURRENCY, return_exceptions: bool = False) -> list:
+    """
+    Awaits func(item) for every item with at most `limit` in flight, keeping result order.
+    Workers pull from a shared iterator, so memory stays bounded by `limit`, not len(items).
+    Without return_exceptions the first failure cancels the remaining work and is
+    raised as itself (not wrapped in the TaskGroup's ExceptionGroup).
+    """
+    results = {}
+    queue = iter(enumerate(items))
+
+    async def worker():
+        for i, item in queue:
+            try:
+                results[i] = await func(item)
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                results[i] = e
+
+    try:
+        async with asyncio.TaskGroup() as tg:
+            for _ in range(max(limit, 1)):
+                tg.create_task(worker())
+    except ExceptionGroup as group:
+        raise group.exceptions[0] from None
+
+    return [results[i] for i in sorted(results)]
+
+
+def run(coro):
+    """Runs a coroutine on a fresh event loop (per-request deadlines come from HostPolicy)."""
+    return asyncio.run(coro)
@@ -3,6 +3,8 @@ import logging
 import os
 import shutil
 import config
+from catalog import Catalog
+from work_queue import WorkQueue
 from datetime import datetime
 
 # Import collectors
@@ -65,13 +67,12 @@ def run_gdelt():
     # GDELT uses config.GDELT_DATA_DIR
     run_script("gdelt.py")
 
-def run_edgar():
+def run_edgar(discovery: str = "submissions"):
     logger.info("Starting EDGAR collection pipeline...")
-    # 1. Submissions
-    run_script("edgar_submissions_nvda.py")
+    # 1. Submissions (per-company JSON) or bulk full-index/daily-index discovery
+    run_edgar_discovery(discovery)
     
-    # 2. Downloader
-    # It will automatically pick up the latest JSON from step 1 because we updated it to do so.
+    # 2. Downloader: fetches the documents the catalog lists as pending, plus failed ones due for a retry
     run_script("edgar_downloader_nvda.py")
     
     # 3. Primary Docs
@@ -80,10 +81,60 @@ def run_edgar():
     # 4. Clean Text
     run_script("edgar_clean_text.py")
 
+def run_edgar_discovery(discovery: str = "submissions"):
+    if discovery == "index":
+        run_script("edgar_full_index.py")
+    else:
+        run_script("edgar_submissions_nvda.py")
+
+def run_queue(sources: list, discovery: str, workers: int):
+    """
+    Queue mode: enqueue every unit of work (per filing document, GDELT time slice,
+    FRED series) and let N worker processes drain the queue. Failed items are
+    retried with backoff; more workers on the same machine can join with `python queue_worker.py`.
+    """
+    import queue_worker
+
+    if "edgar" in sources:
+        logger.info("Discovering EDGAR filings...")
+        run_edgar_discovery(discovery)
+
+    queue = WorkQueue()
+    catalog = Catalog()
+    added = 0
+    if "fred" in sources:
+        added += queue_worker.enqueue_fred(queue)
+    if "gdelt" in sources:
+        added += queue_worker.enqueue_gdelt(queue)
+    if "edgar" in sources:
+        added += queue_worker.enqueue_edgar(queue, catalog)
+    catalog.close()
+    logger.info(f"Enqueued {added} work items.")
+
+    # EDGAR items enqueue their follow-up stages, so workers stay until the queue drains
+    logger.info(f"Starting {workers} queue workers...")
+    procs = [
+        subprocess.Popen([sys.executable, "queue_worker.py", "--exit-when-idle"])
+        for _ in range(workers)
+    ]
+    codes = [p.wait() for p in procs]
+
+    dead = queue.dead_letters()
+    logger.info(f"Queue status: {queue.stats()}")
+    queue.close()
+
+    if any(codes):
+        raise RuntimeError(f"{sum(1 for c in codes if c)} queue workers exited with an error")
+    for item in dead:
+        logger.warning(f"Dead letter {item['queue']} #{item['id']}: {item['last_error']}")
+
 def main():
     parser = argparse.ArgumentParser(description="Finance RAG Data Pipeline")
     parser.add_argument("--source", type=str, choices=["all", "fred", "gdelt", "edgar"], default="all", help="Data source to run")
     parser.add_argument("--clean", action="store_true", help="Clean data directories before running (default: True based on requirements)")
+    parser.add_argument("--edgar-discovery", type=str, choices=["submissions", "index"], default="submissions", help="How to discover EDGAR filings: per-company submissions JSON or bulk full-index/daily-index files")
+    parser.add_argument("--mode", type=str, choices=["sequential", "queue"], default="sequential", help="Run the scripts one after another, or through the SQLite work queue with parallel workers")
+    parser.add_argument("--workers", type=int, default=2, help="Number of queue worker processes (queue mode)")
     
     # User requested: "her zaman data klasörlerinde en güncel veri olsun. eskilerin kalmasına gerek yok."
     # So we force clean by default unless logic changes. 
@@ -93,15 +144,19 @@ def main():
 
     # Determine directories to clean based on source
     dirs_to_clean = []
+    sources_to_forget = []
     
     if args.source in ["all", "fred"]:
+        sources_to_forget.append("fred")
         dirs_to_clean.append(config.RAW_DIR) # FRED puts raw jsons here
         dirs_to_clean.append(config.SUMMARY_DIR)
         
     if args.source in ["all", "gdelt"]:
+        sources_to_forget.append("gdelt")
         dirs_to_clean.append(config.GDELT_DATA_DIR)
         
     if args.source in ["all", "edgar"]:
+        sources_to_forget.append("edgar")
         dirs_to_clean.append(config.EDGAR_DATA_DIR) # Submissions json
         dirs_to_clean.append(config.EDGAR_RAW_DIR)  # Raw filings
         dirs_to_clean.append(config.EDGAR_CLEAN_DIR) # Clean txt
@@ -112,8 +167,22 @@ def main():
     for d in dirs_to_clean:
          clean_directory(d)
 
+    # Keep the catalog and the work queue in step with the deleted files
+    catalog = Catalog()
+    queue = WorkQueue()
+    for source in sources_to_forget:
+        catalog.forget(source)
+        queue.purge(source + ".")
+    catalog.close()
+    queue.close()
+
     # Execute Pipelines
     try:
+        if args.mode == "queue":
+            run_queue(sources_to_forget, args.edgar_discovery, args.workers)
+            logger.info("Pipeline execution completed successfully.")
+            return
+
         if args.source in ["all", "fred"]:
             run_fred()
             
@@ -121,7 +190,7 @@ def main():
             run_gdelt()
             
         if args.source in ["all", "edgar"]:
-            run_edgar()
+            run_edgar(args.edgar_discovery)
             
         logger.info("Pipeline execution completed successfully.")
         
@@ -0,0 +1,240 @@
+import json
+import asyncio
+import logging
+import argparse
+from datetime import datetime, timezone
+import config
+import gdelt
+from catalog import Catalog, worker_id
+from edgar_clean_text import clean_document
+from edgar_download_primary_docs import resolve_primary_doc
+from edgar_store import PackStore, fetch_into_store
+from fred_client import FredClient
+from fred_collector import FredCollector
+from http_runtime import HOST_POLICIES, HttpRuntime, run
+from work_queue import NotReady, SharedTokenBucket, WorkQueue
+
+logger = logging.getLogger("Worker")
+
+EDGAR_FETCH = "edgar.fetch"
+EDGAR_PRIMARY = "edgar.primary"
+EDGAR_CLEAN = "edgar.clean"
+GDELT_SLICE = "gdelt.slice"
+FRED_SERIES = "fred.series"
+FRED_REPORT = "fred.report"
+
+ALL_QUEUES = [EDGAR_FETCH, EDGAR_PRIMARY, EDGAR_CLEAN, GDELT_SLICE, FRED_SERIES, FRED_REPORT]
+
+
+# --- Coordinator side: turn pending work into queue items ---
+
+def enqueue_edgar(queue: WorkQueue, catalog: Catalog) -> int:
+    """Queues every catalog document/filing that still needs a stage."""
+    added = 0
+    for doc in catalog.documents_needing("fetch"):
+        added += queue.enqueue(EDGAR_FETCH, {"accession": doc["accession"], "name": doc["name"]},
+                               dedupe_key=f"fetch:{doc['accession']}:{doc['name']}")
+    for filing in catalog.filings_needing_primary():
+        added += queue.enqueue(EDGAR_PRIMARY, {"accession": filing["accession"]},
+                               dedupe_key=f"primary:{filing['accession']}")
+    for doc in catalog.documents_needing("clean"):
+        added += queue.enqueue(EDGAR_CLEAN, {"accession": doc["accession"], "name": doc["name"]},
+                               dedupe_key=f"clean:{doc['accession']}:{doc['name']}")
+    return added
+
+
+def enqueue_gdelt(queue: WorkQueue, hours: int = config.GDELT_BACKFILL_HOURS,
+                  slice_hours: int = config.GDELT_SLICE_HOURS) -> int:
+    added = 0
+    for start, end in gdelt.time_slices(hours, slice_hours):
+        added += queue.enqueue(GDELT_SLICE, {"start": start, "end": end}, dedupe_key=f"gdelt:{start}:{end}")
+    return added
+
+
+def enqueue_fred(queue: WorkQueue) -> int:
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+    added = 0
+    for sid in config.FRED_SERIES_LIST:
+        added += queue.enqueue(FRED_SERIES, {"series_id": sid, "stamp": stamp}, dedupe_key=f"fred:{sid}:{stamp}")
+    # the report waits (NotReady) until every series of this stamp is saved or dead
+    added += queue.enqueue(FRED_REPORT, {"stamp": stamp}, dedupe_key=f"fred-report:{stamp}")
+    return added
+
+
+def shared_limiters() -> dict:
+    """One database-backed bucket per runtime limiter, so all workers share each host's rate limit."""
+    limiters = {}
+    for host, policy in HOST_POLICIES.items():
+        name = policy.limiter or host
+        if name not in limiters:
+            limiters[name] = SharedTokenBucket(name, policy.rate, policy.burst)
+    return limiters
+
+
+# --- Worker side ---
+
+class Worker:
+    def __init__(self, queues=None, concurrency: int = config.QUEUE_WORKER_CONCURRENCY):
+        self.queues = queues or ALL_QUEUES
+        self.concurrency = concurrency
+        self.worker = worker_id()
+        self.queue = WorkQueue()
+        self.catalog = Catalog()
+        self.store = PackStore()
+        self.runtime = None
+        self.handlers = {
+            EDGAR_FETCH: self.edgar_fetch,
+            EDGAR_PRIMARY: self.edgar_primary,
+            EDGAR_CLEAN: self.edgar_clean,
+            GDELT_SLICE: self.gdelt_slice,
+            FRED_SERIES: self.fred_series,
+            FRED_REPORT: self.fred_report,
+        }
+
+    def close(self):
+        self.queue.close()
+        self.catalog.close()
+        self.store.close()
+
+    # --- Handlers (one unit of work each; raising means retry) ---
+
+    async def edgar_fetch(self, payload: dict):
+        doc = self.catalog.document(payload["accession"], payload["name"])
+        filing, name = doc["filing_key"], doc["name"]
+
+        try:
+            await fetch_into_store(self.runtime, self.store, filing, name, doc["url"])
+        except Exception as e:
+            self.catalog.record_fetch(doc["accession"], name, False, error=str(e))
+            raise
+
+        content_hash, size = self.store.describe(filing, name)
+        self.catalog.record_fetch(doc["accession"], name, True, content_hash, size)
+
+        if doc["kind"] == "index":
+            self.queue.enqueue(EDGAR_PRIMARY, {"accession": doc["accession"]}, dedupe_key=f"primary:{doc['accession']}")
+        elif doc["kind"] == "primary":
+            self.queue.enqueue(EDGAR_CLEAN, payload, dedupe_key=f"clean:{doc['accession']}:{name}")
+
+    async def edgar_primary(self, payload: dict):
+        for filing in self.catalog.filings_needing_primary(payload["accession"]):
+            if resolve_primary_doc(self.catalog, self.store, filing):
+                name = self.catalog.filing(filing["accession"])["primary_document"]
+                self.queue.enqueue(EDGAR_FETCH, {"accession": filing["accession"], "name": name},
+                                   dedupe_key=f"fetch:{filing['accession']}:{name}")
+
+    async def edgar_clean(self, payload: dict):
+        doc = self.catalog.document(payload["accession"], payload["name"])
+        try:
+            # parsing is CPU-bound; keep the loop free for this worker's fetches
+            out_path, facts_path, _ = await asyncio.to_thread(clean_document, self.store, doc)
+        except Exception as e:
+            self.catalog.record_clean(doc["accession"], doc["name"], False, error=str(e))
+            raise
+        self.catalog.record_clean(doc["accession"], doc["name"], True, out_path, facts_path)
+
+    async def gdelt_slice(self, payload: dict):
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+        await gdelt.collect(self.runtime, stamp, payload["start"], payload["end"])
+
+    async def fred_series(self, payload: dict):
+        sid = payload["series_id"]
+        df = await FredClient().fetch_series_async(self.runtime, sid)
+        if df.empty:
+            raise RuntimeError(f"empty data for {sid}")
+
+        collector = FredCollector()
+        collector.stamp = payload["stamp"]
+        collector.save_raw(sid, df, self.catalog)
+
+    async def fred_report(self, payload: dict):
+        collector = FredCollector()
+        collector.stamp = payload["stamp"]
+
+        dataframes = {}
+        for sid in config.FRED_SERIES_LIST:
+            status = self.queue.status(f"fred:{sid}:{payload['stamp']}")
+            if status == "dead":
+                # same as the sequential run: report on the series that came back
+                continue
+            if status != "done":
+                raise NotReady(delay=15)
+            dataframes[sid] = collector.load_raw(self.catalog.latest_run("fred", f"raw:{sid}")["output_path"])
+
+        collector.save_report(dataframes, self.catalog)
+
+    # --- Loop ---
+
+    async def heartbeat(self, item, worker: str, task: asyncio.Task):
+        """Keeps the lease alive; if another worker has taken the item over, stops the handler."""
+        while True:
+            await asyncio.sleep(config.QUEUE_VISIBILITY_TIMEOUT / 3)
+            if not self.queue.extend(item, worker):
+                logger.warning(f"{item['queue']} #{item['id']} lease lost, stopping")
+                task.cancel()
+                return
+
+    async def process(self, item, worker: str):
+        handler = self.handlers[item["queue"]]
+        task = asyncio.create_task(handler(json.loads(item["payload"])))
+        beat = asyncio.create_task(self.heartbeat(item, worker, task))
+        try:
+            await task
+        except asyncio.CancelledError:
+            if not beat.done():
+                raise
+            # lease lost: the item belongs to whoever re-leased it now
+        except NotReady as e:
+            self.queue.defer(item, worker, e.delay)
+        except Exception as e:
+            logger.error(f"{item['queue']} #{item['id']} attempt {item['attempts']} failed: {e}")
+            if not self.queue.fail(item, worker, str(e)):
+                logger.warning(f"{item['queue']} #{item['id']} lease lost, failure not recorded")
+        else:
+            if self.queue.ack(item, worker):
+                logger.info(f"{item['queue']} #{item['id']} done")
+            else:
+                logger.warning(f"{item['queue']} #{item['id']} finished after its lease was lost")
+        finally:
+            beat.cancel()
+            task.cancel()
+
+    async def slot(self, n: int, exit_when_idle: bool):
+        name = f"{self.worker}/{n}"
+        while True:
+            item = self.queue.lease(name, self.queues)
+            if item is None:
+                if exit_when_idle and self.queue.outstanding(self.queues) == 0:
+                    return
+                await asyncio.sleep(config.QUEUE_POLL_INTERVAL)
+                continue
+            await self.process(item, name)
+
+    async def run(self, exit_when_idle: bool = False):
+        async with HttpRuntime(limiters=shared_limiters()) as runtime:
+            self.runtime = runtime
+            async with asyncio.TaskGroup() as tg:
+                for n in range(self.concurrency):
+                    tg.create_task(self.slot(n, exit_when_idle))
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Work-queue worker for the Finance RAG pipeline")
+    parser.add_argument("--queues", type=str, default=",".join(ALL_QUEUES), help="Comma-separated queues to serve")
+    parser.add_argument("--concurrency", type=int, default=config.QUEUE_WORKER_CONCURRENCY, help="Items processed concurrently by this process")
+    parser.add_argument("--exit-when-idle", action="store_true", help="Exit once no pending or leased items remain")
+    args = parser.parse_args()
+
+    worker = Worker(args.queues.split(","), args.concurrency)
+    try:
+        run(worker.run(args.exit_when_idle))
+    finally:
+        worker.close()
+
+    logger.info(f"Queue status: {WorkQueue().stats()}")
+
+
+if __name__ == "__main__":
+    main()
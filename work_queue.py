@@ -0,0 +1,257 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+from typing import Iterable, Optional
+import config
+
+DB_PATH = config.QUEUE_DB
+
+# An item is still ours only while it is leased to us with the attempt we leased it at;
+# after our lease expires another worker may have re-leased it (attempts went up)
+HELD_BY = "status = 'leased' AND worker = ? AND attempts = ?"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    queue        TEXT NOT NULL,
+    payload      TEXT NOT NULL,
+    dedupe_key   TEXT UNIQUE,
+    status       TEXT NOT NULL DEFAULT 'pending',
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    lease_until  REAL,
+    worker       TEXT,
+    last_error   TEXT,
+    created_at   REAL NOT NULL,
+    updated_at   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_items_ready ON items (status, queue, available_at);
+CREATE INDEX IF NOT EXISTS idx_items_lease ON items (status, lease_until);
+
+CREATE TABLE IF NOT EXISTS rate_limits (
+    name    TEXT PRIMARY KEY,
+    tokens  REAL NOT NULL,
+    updated REAL NOT NULL
+);
+"""
+
+
+class NotReady(Exception):
+    """Raised by a handler whose inputs are not there yet; the item is retried without using an attempt."""
+
+    def __init__(self, delay: float = 30):
+        self.delay = delay
+        super().__init__(f"not ready, retry in {delay}s")
+
+
+def connect(db_path: str = DB_PATH) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class WorkQueue:
+    """
+    Durable work queue on SQLite (no broker). Workers lease items for a visibility
+    timeout; an item whose lease expires (worker crash) becomes visible again.
+    Failures retry with exponential backoff until max_attempts, then the item is
+    dead-lettered. dedupe_key makes enqueueing idempotent, so finished work is
+    never queued twice. ack/fail/defer/extend only touch an item the caller
+    still holds, so a worker whose lease expired cannot overwrite the outcome
+    of the worker that re-leased it; they return False when the lease is lost. WAL mode means all workers must run on one host; the
+    database must not live on a network filesystem.
+    """
+
+    def __init__(self, db_path: str = DB_PATH):
+        self.conn = connect(db_path)
+
+    def close(self):
+        self.conn.close()
+
+    def _transaction(self, fn):
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn()
+            self.conn.execute("COMMIT")
+            return result
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def enqueue(self, queue: str, payload: dict, dedupe_key: str = None,
+                max_attempts: int = config.QUEUE_MAX_ATTEMPTS, delay: float = 0) -> bool:
+        now = time.time()
+        cur = self._transaction(lambda: self.conn.execute(
+            """
+            INSERT OR IGNORE INTO items (queue, payload, dedupe_key, max_attempts, available_at, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (queue, json.dumps(payload), dedupe_key, max_attempts, now + delay, now, now)
+        ))
+        return cur.rowcount > 0
+
+    def lease(self, worker: str, queues: Iterable[str] = None,
+              visibility_timeout: float = config.QUEUE_VISIBILITY_TIMEOUT) -> Optional[sqlite3.Row]:
+        """Leases the oldest ready item (pending, or leased with an expired lease)."""
+        def take():
+            now = time.time()
+
+            # expired leases that already used every attempt go to the dead letters
+            self.conn.execute(
+                """
+                UPDATE items SET status = 'dead', last_error = COALESCE(last_error, 'lease expired'), updated_at = ?
+                WHERE status = 'leased' AND lease_until < ? AND attempts >= max_attempts
+                """,
+                (now, now)
+            )
+
+            sql = """
+                SELECT id FROM items
+                WHERE ((status = 'pending' AND available_at <= ?) OR (status = 'leased' AND lease_until < ?))
+            """
+            params = [now, now]
+            if queues:
+                names = list(queues)
+                sql += f" AND queue IN ({','.join('?' * len(names))})"
+                params += names
+            sql += " ORDER BY available_at, id LIMIT 1"
+
+            row = self.conn.execute(sql, params).fetchone()
+            if row is None:
+                return None
+
+            self.conn.execute(
+                """
+                UPDATE items SET status = 'leased', attempts = attempts + 1, lease_until = ?,
+                       worker = ?, updated_at = ?
+                WHERE id = ?
+                """,
+                (now + visibility_timeout, worker, now, row["id"])
+            )
+            return self.conn.execute("SELECT * FROM items WHERE id = ?", (row["id"],)).fetchone()
+
+        return self._transaction(take)
+
+    def _update_held(self, item: sqlite3.Row, worker: str, assignments: str, params: list) -> bool:
+        cur = self._transaction(lambda: self.conn.execute(
+            f"UPDATE items SET {assignments} WHERE id = ? AND {HELD_BY}",
+            params + [item["id"], worker, item["attempts"]]
+        ))
+        return cur.rowcount > 0
+
+    def extend(self, item: sqlite3.Row, worker: str,
+               visibility_timeout: float = config.QUEUE_VISIBILITY_TIMEOUT) -> bool:
+        """Heartbeat for long-running items."""
+        now = time.time()
+        return self._update_held(item, worker, "lease_until = ?, updated_at = ?", [now + visibility_timeout, now])
+
+    def ack(self, item: sqlite3.Row, worker: str) -> bool:
+        return self._update_held(
+            item, worker, "status = 'done', lease_until = NULL, last_error = NULL, updated_at = ?", [time.time()]
+        )
+
+    def fail(self, item: sqlite3.Row, worker: str, error: str, backoff: float = config.QUEUE_RETRY_BACKOFF) -> bool:
+        now = time.time()
+        if item["attempts"] >= item["max_attempts"]:
+            status, available_at = "dead", now
+        else:
+            status, available_at = "pending", now + backoff * (2 ** (item["attempts"] - 1))
+
+        return self._update_held(
+            item, worker, "status = ?, available_at = ?, lease_until = NULL, last_error = ?, updated_at = ?",
+            [status, available_at, error, now]
+        )
+
+    def defer(self, item: sqlite3.Row, worker: str, delay: float) -> bool:
+        """Puts an item back without counting the attempt (see NotReady)."""
+        now = time.time()
+        return self._update_held(
+            item, worker,
+            "status = 'pending', attempts = attempts - 1, available_at = ?, lease_until = NULL, updated_at = ?",
+            [now + delay, now]
+        )
+
+    def status(self, dedupe_key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT status FROM items WHERE dedupe_key = ?", (dedupe_key,)).fetchone()
+        return row["status"] if row else None
+
+    def stats(self) -> dict:
+        rows = self.conn.execute("SELECT queue, status, COUNT(*) AS n FROM items GROUP BY queue, status").fetchall()
+        return {f"{r['queue']}/{r['status']}": r["n"] for r in rows}
+
+    def outstanding(self, queues: Iterable[str] = None) -> int:
+        sql = "SELECT COUNT(*) FROM items WHERE status IN ('pending', 'leased')"
+        params = []
+        if queues:
+            names = list(queues)
+            sql += f" AND queue IN ({','.join('?' * len(names))})"
+            params = names
+        return self.conn.execute(sql, params).fetchone()[0]
+
+    def dead_letters(self, queue: str = None) -> list:
+        sql = "SELECT * FROM items WHERE status = 'dead'"
+        params = []
+        if queue:
+            sql += " AND queue = ?"
+            params.append(queue)
+        return self.conn.execute(sql + " ORDER BY updated_at", params).fetchall()
+
+    def requeue_dead(self, queue: str = None) -> int:
+        sql = "UPDATE items SET status = 'pending', attempts = 0, available_at = ?, updated_at = ? WHERE status = 'dead'"
+        params = [time.time(), time.time()]
+        if queue:
+            sql += " AND queue = ?"
+            params.append(queue)
+        return self._transaction(lambda: self.conn.execute(sql, params)).rowcount
+
+    def purge(self, prefix: str):
+        """Forgets every item of queues starting with prefix (used when the pipeline wipes a source)."""
+        self._transaction(lambda: self.conn.execute("DELETE FROM items WHERE queue LIKE ?", (prefix + "%",)))
+
+
+class SharedTokenBucket:
+    """
+    Token bucket persisted in the queue database, so every worker process on this
+    machine draws from one global rate limit (e.g. SEC's 10 req/s).
+    Drop-in for http_runtime.TokenBucket.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int = 1, db_path: str = DB_PATH):
+        self.name = name
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.conn = connect(db_path)
+
+    def try_acquire(self) -> float:
+        """Takes a token if available; otherwise returns the seconds to wait."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = self.conn.execute("SELECT tokens, updated FROM rate_limits WHERE name = ?", (self.name,)).fetchone()
+            tokens = self.capacity if row is None else min(self.capacity, row["tokens"] + (now - row["updated"]) * self.rate)
+
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / self.rate
+
+            self.conn.execute("INSERT OR REPLACE INTO rate_limits VALUES (?, ?, ?)", (self.name, tokens, now))
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    async def acquire(self):
+        while True:
+            wait = self.try_acquire()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)